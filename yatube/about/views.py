@@ -1,7 +1,5 @@
-import datetime
 from django.views.generic.base import TemplateView
-from core.views import get_client_ip
-from posts.models import Ip
+from core.visitors import track_visit
 
 
 class AboutAuthorView(TemplateView):
@@ -9,13 +7,7 @@ class AboutAuthorView(TemplateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(
-            created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         return context
 
 
@@ -24,11 +16,5 @@ class AboutTechView(TemplateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(
-            created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         return context
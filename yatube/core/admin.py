@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail, StoredFile
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'subject',
+        'to',
+        'status',
+        'attempts',
+        'next_attempt',
+        'sent',
+    )
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    empty_value_display = '-пусто-'
+
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'references', 'updated')
+    search_fields = ('name',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(StoredFile, StoredFileAdmin)
@@ -0,0 +1,40 @@
+# core/cache.py
+"""Общие кэши проекта и проверка их доступности."""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+FEED = 'feed'
+COUNTERS = 'counters'
+SEARCH = 'search'
+
+logger = logging.getLogger(__name__)
+
+
+def check_cache(alias):
+    """
+    Записывает, читает и удаляет пробный ключ в кэше alias.
+    Ошибка пишется в лог: в её тексте бывают адреса и пути.
+    """
+    key = f'health:{uuid.uuid4().hex}'
+    started = time.monotonic()
+    try:
+        backend = caches[alias]
+        backend.set(key, key, 10)
+        ok = backend.get(key) == key
+        backend.delete(key)
+    except Exception:
+        logger.exception('Кэш %s недоступен', alias)
+        ok = False
+    return {
+        'ok': ok,
+        'latency_ms': round((time.monotonic() - started) * 1000, 2),
+    }
+
+
+def check_caches():
+    """Состояние всех кэшей из settings.CACHES."""
+    return {alias: check_cache(alias) for alias in settings.CACHES}
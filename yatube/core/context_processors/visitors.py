@@ -0,0 +1,29 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.cache import COUNTERS
+from posts.models import DailyVisitStats
+
+VISITORS_CACHE_KEY = 'core:visitors'
+
+
+def visitors(request):
+    """
+    Добавляет число посетителей за всё время и за сегодня.
+    Значения читаются из последней строки дневной статистики и кэшируются.
+    """
+    cache = caches[COUNTERS]
+    stats = cache.get(VISITORS_CACHE_KEY)
+    if stats is None:
+        latest = DailyVisitStats.objects.order_by('-date').first()
+        stats = {
+            'visiterAll': latest.total_visitors if latest else 0,
+            'visiterDay': (
+                latest.unique_visitors
+                if latest and latest.date == datetime.date.today() else 0
+            ),
+        }
+        cache.set(VISITORS_CACHE_KEY, stats, settings.VISITORS_STATS_TTL)
+    return stats
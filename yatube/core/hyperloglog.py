@@ -0,0 +1,70 @@
+# core/hyperloglog.py
+"""
+HyperLogLog — приближённый подсчёт уникальных значений
+с фиксированным объёмом памяти (2 ** precision байт).
+"""
+import hashlib
+import math
+
+DEFAULT_PRECISION = 12
+
+
+class HyperLogLog:
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision должен быть от 4 до 16')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers or self.size)
+        if len(self.registers) != self.size:
+            raise ValueError('Размер регистров не совпадает с precision')
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Скетч из данных to_bytes(); пустые данные — пустой скетч."""
+        if not data:
+            return cls()
+        data = bytes(data)
+        return cls(precision=data[0], registers=data[1:])
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    def add(self, value):
+        digest = hashlib.sha1(str(value).encode()).digest()
+        hashed = int.from_bytes(digest[:8], 'big')
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Объединяет скетч с другим скетчем той же точности."""
+        if other.precision != self.precision:
+            raise ValueError('Нельзя объединить скетчи разной точности')
+        self.registers = bytearray(
+            max(pair) for pair in zip(self.registers, other.registers)
+        )
+        return self
+
+    def count(self):
+        """Оценка числа уникальных значений."""
+        if self.size >= 128:
+            alpha = 0.7213 / (1 + 1.079 / self.size)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.size]
+        estimate = alpha * self.size ** 2 / sum(
+            2.0 ** -register for register in self.registers
+        )
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
@@ -0,0 +1,127 @@
+# core/mail.py
+"""
+Отложенная отправка писем.
+
+queue_mail() только сохраняет письмо в очередь OutgoingEmail в текущей
+транзакции и ставит фоновую задачу, если её ещё не поставили. Задача
+отправляет накопившиеся письма пачкой через одно соединение с почтовым
+сервером; неудачные письма повторяются с растущей задержкой.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import OutgoingEmail
+from jobs.tasks import task
+
+logger = logging.getLogger(__name__)
+
+# Ключ-замок: пока задача отправки ждёт очереди, новую не ставим
+DELIVER_KEY = 'mail:deliver'
+
+
+def queue_mail(subject, body, to, from_email=None, html=False):
+    """Ставит письмо в очередь на отправку."""
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        html=html,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to='\n'.join(to),
+    )
+    request_delivery()
+    return email
+
+
+def request_delivery():
+    """Ставит отправку очереди, если её ещё не поставили."""
+    # Замок истекает сам, если задача не выполнилась
+    if cache.add(DELIVER_KEY, True, settings.MAIL_OUTBOX_SEND_TIMEOUT):
+        deliver_outbox.delay()
+
+
+def postpone(email, error):
+    """Откладывает повтор письма или отмечает ошибку после всех попыток."""
+    sending = OutgoingEmail.objects.filter(
+        pk=email.pk,
+        status=OutgoingEmail.SENDING,
+        locked_until=email.locked_until,
+    )
+    if email.attempts >= settings.MAIL_OUTBOX_MAX_ATTEMPTS:
+        sending.update(status=OutgoingEmail.FAILED, last_error=error)
+        return
+    next_attempt = timezone.now() + datetime.timedelta(
+        seconds=settings.MAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+    )
+    sending.update(
+        status=OutgoingEmail.PENDING,
+        next_attempt=next_attempt,
+        locked_until=None,
+        last_error=error,
+    )
+    deliver_outbox.schedule(next_attempt)
+
+
+def send_outbox(batch=None):
+    """
+    Отправляет пачку писем через одно соединение.
+    Возвращает число отправленных писем.
+    """
+    batch = batch or settings.MAIL_OUTBOX_BATCH
+    emails = OutgoingEmail.objects.claim(
+        batch, settings.MAIL_OUTBOX_SEND_TIMEOUT
+    )
+    if not emails:
+        # Письма мог взять упавший отправитель: разбираем их снова,
+        # когда истечёт их замок
+        locked_until = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENDING
+        ).aggregate(first=Min('locked_until'))['first']
+        if locked_until is not None:
+            deliver_outbox.schedule(
+                locked_until + datetime.timedelta(seconds=1)
+            )
+        return 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.exception('Не удалось подключиться к почтовому серверу')
+        for email in emails:
+            postpone(email, str(exc))
+        return 0
+    sent = 0
+    try:
+        for email in emails:
+            try:
+                email.to_message(connection).send()
+            except Exception as exc:
+                logger.exception('Не удалось отправить письмо %s', email.pk)
+                postpone(email, str(exc))
+                continue
+            OutgoingEmail.objects.filter(
+                pk=email.pk, locked_until=email.locked_until
+            ).update(
+                status=OutgoingEmail.SENT,
+                sent=timezone.now(),
+                locked_until=None,
+            )
+            sent += 1
+    finally:
+        connection.close()
+    if len(emails) == batch:
+        # Очередь могла не опустеть
+        deliver_outbox.delay()
+    return sent
+
+
+@task
+def deliver_outbox():
+    # Письма, поставленные во время отправки, получат свою задачу
+    cache.delete(DELIVER_KEY)
+    send_outbox()
@@ -0,0 +1,89 @@
+# core/middleware.py
+"""
+Раздача статики из STATIC_ROOT прямо из приложения.
+
+Файлы с хешем в имени (их пишет CompressedManifestStaticFilesStorage)
+не меняются никогда, поэтому кешируются браузером на год
+с immutable. Остальные — на STATIC_MAX_AGE секунд. Если клиент
+принимает br или gzip и рядом лежит сжатая копия, отдаётся она.
+ETag позволяет отвечать 304 без тела.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+# Хеш, который ManifestStaticFilesStorage вставляет в имя файла
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return {
+        value.split(';')[0].strip() for value in header.split(',')
+        if not value.strip().endswith(';q=0')
+    }
+
+
+def find_file(path, request):
+    """Путь к файлу или его сжатой копии, кодировка и os.stat()."""
+    if not os.path.isfile(path):
+        return None
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding, os.stat(path + suffix)
+    return path, None, os.stat(path)
+
+
+class StaticFilesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = None
+        if (settings.STATIC_ROOT
+                and request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(settings.STATIC_URL)):
+            response = self.serve(
+                request, request.path_info[len(settings.STATIC_URL):]
+            )
+        return response or self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except ValueError:
+            return None
+        found = find_file(path, request)
+        if found is None:
+            return None
+        filename, encoding, stat = found
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(filename, 'rb'))
+            content_type = mimetypes.guess_type(path)[0]
+            response['Content-Type'] = (
+                content_type or 'application/octet-stream'
+            )
+            response['Content-Length'] = stat.st_size
+            response['Last-Modified'] = http_date(stat.st_mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        if HASHED_NAME.search(name):
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = f'public, max-age={settings.STATIC_MAX_AGE}'
+        response['Cache-Control'] = cache_control
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
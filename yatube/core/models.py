@@ -1,5 +1,10 @@
 # core/models.py
-from django.db import models
+import datetime
+
+from django.core.mail import EmailMessage
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -12,3 +17,134 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    def claim(self, limit, timeout):
+        """
+        Забирает до limit писем, готовых к отправке. Взятые письма
+        скрыты от других отправителей на timeout секунд.
+        """
+        now = timezone.now()
+        ready = (
+            Q(status=OutgoingEmail.PENDING, next_attempt__lte=now)
+            | Q(status=OutgoingEmail.SENDING, locked_until__lt=now)
+        )
+        with transaction.atomic():
+            ids = list(
+                self.filter(ready).order_by('next_attempt')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            locked_until = now + datetime.timedelta(seconds=timeout)
+            self.filter(ready, pk__in=ids).update(
+                status=OutgoingEmail.SENDING,
+                locked_until=locked_until,
+                attempts=F('attempts') + 1,
+            )
+        return list(
+            self.filter(
+                pk__in=ids,
+                status=OutgoingEmail.SENDING,
+                locked_until=locked_until,
+            )
+        )
+
+
+class OutgoingEmail(CreatedModel):
+    """Письмо в очереди на отправку."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    html = models.BooleanField('HTML', default=False)
+    from_email = models.CharField('Отправитель', max_length=255)
+    to = models.TextField('Получатели', help_text='По одному в строке')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now
+    )
+    locked_until = models.DateTimeField(
+        'Занято до',
+        blank=True,
+        null=True
+    )
+    sent = models.DateTimeField('Отправлено', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [models.Index(fields=['status', 'next_attempt'])]
+
+    def __str__(self):
+        return f'{self.subject} → {self.to}'
+
+    def to_message(self, connection):
+        message = EmailMessage(
+            self.subject,
+            self.body,
+            self.from_email,
+            self.to.split(),
+            connection=connection,
+        )
+        if self.html:
+            message.content_subtype = 'html'
+        return message
+
+
+class StoredFileQuerySet(models.QuerySet):
+    def acquire(self, name):
+        """Добавляет ссылку на файл хранилища."""
+        with transaction.atomic():
+            self.bulk_create([StoredFile(name=name)], ignore_conflicts=True)
+            self.filter(name=name).update(references=F('references') + 1)
+
+    def release(self, name):
+        """Снимает ссылку на файл; True, если ссылок не осталось."""
+        with transaction.atomic():
+            self.filter(name=name, references__gt=0).update(
+                references=F('references') - 1
+            )
+            return not self.filter(name=name, references__gt=0).exists()
+
+    def discard(self, name):
+        """Забывает файл без ссылок; True, если его можно удалять."""
+        deleted, _ = self.filter(name=name, references=0).delete()
+        return bool(deleted)
+
+
+class StoredFile(models.Model):
+    """Счётчик ссылок на файл в хранилище с адресацией по содержимому."""
+    name = models.CharField('Файл', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+    updated = models.DateTimeField('Изменён', auto_now=True)
+
+    objects = StoredFileQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
@@ -0,0 +1,93 @@
+# core/pagination.py
+"""
+Курсорная (keyset) пагинация для бесконечной ленты.
+
+Следующая страница выбирается условием по (pub_date, id) последнего
+поста вместо OFFSET, без COUNT(*), и не «съезжает», когда в ленту
+добавляются новые посты.
+"""
+import base64
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(pub_date, pk):
+    raw = json.dumps([pub_date.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        pub_date, pk = json.loads(raw)
+        return datetime.datetime.fromisoformat(pub_date), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+
+class CursorPage(Sequence):
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __repr__(self):
+        return f'<CursorPage next={self.next_cursor!r}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return False
+
+    def has_other_pages(self):
+        return self.has_next()
+
+
+class CursorPaginator:
+    """Пагинатор по убыванию (pub_date, id)."""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-pub_date', '-id')
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        if cursor:
+            pub_date, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        rows = list(queryset[:self.per_page + 1])
+        object_list = rows[:self.per_page]
+        next_cursor = None
+        if len(rows) > self.per_page:
+            last = object_list[-1]
+            next_cursor = encode_cursor(last.pub_date, last.pk)
+        return CursorPage(object_list, next_cursor)
+
+
+class CursorPaginationMixin:
+    """Подменяет постраничную пагинацию ListView курсорной (?cursor=...)."""
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,94 @@
+# core/storage.py
+"""
+Хранилища файлов.
+
+ContentAddressedStorage сохраняет файл под SHA-256 его содержимого:
+posts/cat.jpg -> posts/3f/3fa9….jpg. Одинаковые загрузки попадают
+в один и тот же файл, который записывается только один раз.
+Сколько объектов ссылается на файл, считает core.models.StoredFile.
+
+CompressedManifestStaticFilesStorage — статика с хешем в имени
+(app.js -> app.3f9a2b1c0d4e.js) и заранее сжатыми копиями .gz и .br
+для core.middleware.StaticFilesMiddleware.
+"""
+import gzip
+import hashlib
+import os
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Какие файлы сжимать заранее и начиная с какого размера (байт)
+COMPRESSIBLE = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html')
+COMPRESS_MIN_SIZE = 256
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def compress(path):
+    """Пишет рядом с файлом .gz и .br, если они меньше оригинала."""
+    with open(path, 'rb') as source:
+        content = source.read()
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # До первого collectstatic манифеста нет: отдаём имя как есть
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            path = self.path(name)
+            if (name.endswith(COMPRESSIBLE)
+                    and os.path.getsize(path) >= COMPRESS_MIN_SIZE):
+                compress(path)
@@ -0,0 +1,2 @@
+# Задачи core объявлены рядом с их логикой
+from core.mail import deliver_outbox  # noqa: F401
@@ -0,0 +1,20 @@
+# core/test_runner.py
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+# Настройки, с которыми выполняются все тесты проекта
+TEST_SETTINGS = {
+    'JOBS_EAGER': True,
+    'VISITORS_FLUSH_INTERVAL': 0,
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
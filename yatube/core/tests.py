@@ -1,6 +1,33 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
 from http import HTTPStatus
+from unittest import mock, skipIf
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import COUNTERS
+from core.context_processors.visitors import visitors
+from core.hyperloglog import HyperLogLog
+from core.mail import deliver_outbox, queue_mail, send_outbox
+from core.models import OutgoingEmail
+from core.views import registrarion_send_mail
+from core.visitors import VisitBuffer
+from jobs.models import Job
+from posts.models import DailyVisitStats, Ip, VisitorSketch
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -14,3 +41,299 @@ class ViewTestClass(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         # Проверьте, что используется шаблон core/404.html
         self.assertTemplateUsed(response, 'core/404.html')
+
+    @override_settings(HEALTH_CHECK_TOKEN='secret')
+    def test_cache_health(self):
+        """Проверка кэшей — для staff или по токену, без текста ошибок."""
+        url = reverse('cache_health')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.client.get(url, HTTP_X_HEALTH_TOKEN='wrong')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.client.get(url, HTTP_X_HEALTH_TOKEN='secret')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            set(response.json()['caches']),
+            {'default', 'feed', 'counters', 'search'}
+        )
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        with mock.patch.object(
+            caches['feed'], 'set', side_effect=OSError('redis:6379')
+        ), self.assertLogs('core.cache', 'ERROR'):
+            response = self.client.get(url)
+        self.assertEqual(
+            response.status_code, HTTPStatus.SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(
+            set(response.json()['caches']['feed']), {'ok', 'latency_ms'}
+        )
+        self.assertNotIn('redis', response.content.decode())
+
+    @skipIf(settings.REDIS_URL, 'Кэш в Redis')
+    def test_cache_aliases_have_own_tables(self):
+        """У каждого кэша своя таблица и свой предел числа ключей."""
+        tables = {caches[alias]._table for alias in settings.CACHES}
+        self.assertEqual(len(tables), len(settings.CACHES))
+        for alias, max_entries in settings.CACHE_MAX_ENTRIES.items():
+            self.assertEqual(caches[alias]._max_entries, max_entries)
+
+
+@mock.patch.object(VisitBuffer, '_ensure_thread')
+@override_settings(VISITORS_FLUSH_INTERVAL=5, VISITORS_BUFFER_SIZE=2)
+class VisitBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_flush_writes_unique_ips_in_one_batch(self, ensure_thread):
+        """Буфер схлопывает повторы и пишет ip одной пачкой."""
+        Ip.objects.create(ip='10.0.0.1')
+        buffer = VisitBuffer()
+        buffer.add('10.0.0.1', 'posts:main')
+        buffer.add('10.0.0.2', 'posts:main')
+        buffer.add('10.0.0.2', 'about:tech')
+        self.assertEqual(Ip.objects.count(), 1)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(
+            set(Ip.objects.values_list('ip', flat=True)),
+            {'10.0.0.1', '10.0.0.2'}
+        )
+
+    def test_flush_updates_daily_stats(self, ensure_thread):
+        """Сброс буфера пополняет дневную статистику посещаемости."""
+        DailyVisitStats.objects.create(
+            date=datetime.date.today() - datetime.timedelta(days=1),
+            total_visitors=5
+        )
+        buffer = VisitBuffer()
+        buffer.add('10.0.0.1', 'posts:main')
+        buffer.add('10.0.0.1', 'posts:main')
+        buffer.add('10.0.0.2', 'about:tech')
+        buffer.flush()
+        buffer.add('10.0.0.1', 'posts:main')
+        buffer.flush()
+        stats = DailyVisitStats.objects.get(date=datetime.date.today())
+        self.assertEqual(stats.unique_visitors, 2)
+        self.assertEqual(stats.new_visitors, 2)
+        self.assertEqual(stats.total_visitors, 7)
+        self.assertEqual(stats.page_views, 4)
+        self.assertEqual(
+            dict(stats.views.values_list('view_name', 'page_views')),
+            {'posts:main': 3, 'about:tech': 1}
+        )
+
+    @override_settings(VISITORS_BUFFER_SIZE=1000)
+    def test_unique_visitors_survive_cache_eviction(self, ensure_thread):
+        """Уникальные за день не зависят от вытеснения ключей из кэша."""
+        buffer = VisitBuffer()
+        for _ in range(2):
+            for i in range(400):
+                buffer.add(f'10.0.{i // 256}.{i % 256}', 'posts:main')
+            buffer.flush()
+            caches[COUNTERS].clear()
+        stats = DailyVisitStats.objects.get(date=datetime.date.today())
+        self.assertEqual(stats.unique_visitors, 400)
+
+    def test_buffer_is_bounded(self, ensure_thread):
+        """Переполненный буфер отбрасывает новые ip."""
+        buffer = VisitBuffer()
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            buffer.add(ip)
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(set(buffer.drain()), {'10.0.0.1', '10.0.0.2'})
+
+    @override_settings(VISITORS_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_through(self, ensure_thread):
+        """При нулевом интервале посещение пишется сразу."""
+        VisitBuffer().add('10.0.0.9')
+        self.assertTrue(Ip.objects.filter(ip='10.0.0.9').exists())
+        ensure_thread.assert_not_called()
+
+    @override_settings(VISITORS_COUNTER='hll', VISITORS_BUFFER_SIZE=1000)
+    def test_hll_mode_keeps_sketches_instead_of_ips(self, ensure_thread):
+        """В режиме hll ip не хранятся, уникальные считаются скетчами."""
+        buffer = VisitBuffer()
+        for i in range(1000):
+            buffer.add(f'10.0.{i // 256}.{i % 256}', 'posts:main')
+        buffer.flush()
+        buffer.add('10.0.0.1', 'posts:main')
+        buffer.flush()
+        self.assertFalse(Ip.objects.exists())
+        stats = DailyVisitStats.objects.get(date=datetime.date.today())
+        today = datetime.date.today()
+        for unique in (
+            stats.unique_visitors,
+            stats.total_visitors,
+            VisitorSketch.unique_between(today, today),
+        ):
+            self.assertAlmostEqual(unique, 1000, delta=50)
+        self.assertEqual(stats.page_views, 1001)
+
+
+class HyperLogLogTests(TestCase):
+    def test_estimate_within_error(self):
+        """Оценка уникальных значений укладывается в погрешность."""
+        sketch = HyperLogLog()
+        sketch.update(range(20000))
+        sketch.update(range(10000))
+        self.assertAlmostEqual(sketch.count(), 20000, delta=20000 * 0.05)
+
+    def test_merge_and_serialization(self):
+        """Скетчи объединяются и переживают сериализацию."""
+        monday, tuesday = HyperLogLog(), HyperLogLog()
+        monday.update(range(0, 1000))
+        tuesday.update(range(500, 1500))
+        restored = HyperLogLog.from_bytes(monday.to_bytes())
+        self.assertEqual(restored.count(), monday.count())
+        self.assertAlmostEqual(
+            restored.merge(tuesday).count(), 1500, delta=1500 * 0.05
+        )
+
+
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    for alias in ('default', 'feed', 'counters', 'search')
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VisitorsContextProcessorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+
+    def test_visitors_counted_once_and_cached(self):
+        """Статистика посетителей читается одной строкой и кэшируется."""
+        DailyVisitStats.objects.create(
+            date=datetime.date.today(), unique_visitors=1, total_visitors=2
+        )
+        with self.assertNumQueries(1):
+            stats = visitors(self.request)
+        self.assertEqual(stats, {'visiterAll': 2, 'visiterDay': 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(visitors(self.request), stats)
+
+
+@override_settings(JOBS_EAGER=False)
+class OutboxTests(TestCase):
+    def queue(self, count):
+        for number in range(count):
+            queue_mail(f'Письмо {number}', 'Текст', [f'user{number}@test.ru'])
+
+    def test_batch_sent_over_one_connection(self):
+        """Пачка писем уходит через одно соединение."""
+        self.queue(3)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.count(), 1)
+        with mock.patch(
+            'core.mail.get_connection', wraps=get_connection
+        ) as connect:
+            self.assertEqual(send_outbox(), 3)
+        connect.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists()
+        )
+
+    def test_failed_email_retried_with_backoff(self):
+        """Неотправленное письмо откладывается, остальные уходят."""
+        self.queue(2)
+        with mock.patch(
+            'django.core.mail.EmailMessage.send',
+            side_effect=[OSError('timeout'), 1],
+        ), self.assertLogs('core.mail', 'ERROR'):
+            self.assertEqual(send_outbox(), 1)
+        failed = OutgoingEmail.objects.get(status=OutgoingEmail.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.next_attempt, timezone.now())
+        self.assertEqual(failed.last_error, 'timeout')
+        self.assertTrue(
+            Job.objects.filter(run_at=failed.next_attempt).exists()
+        )
+        self.assertEqual(send_outbox(), 0)
+
+    def test_delivery_queued_again_after_job_started(self):
+        """Письмо после начала отправки получает новую задачу."""
+        self.queue(2)
+        deliver_outbox()
+        self.queue(1)
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(send_outbox(), 1)
+
+    def test_emails_of_dead_sender_retried_after_lock(self):
+        """Письма упавшего отправителя разбираются, когда истечёт замок."""
+        self.queue(2)
+        emails = OutgoingEmail.objects.claim(10, 300)
+        self.assertEqual(send_outbox(), 0)
+        self.assertTrue(Job.objects.filter(
+            run_at=emails[0].locked_until + datetime.timedelta(seconds=1)
+        ).exists())
+
+    @override_settings(JOBS_EAGER=True)
+    def test_signup_email_delivered_by_eager_job(self):
+        registrarion_send_mail('new@test.ru', 'new')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@test.ru'])
+        self.assertEqual(mail.outbox[0].content_subtype, 'html')
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.source, 'js'))
+        with open(os.path.join(self.source, 'js', 'like.js'), 'w') as file:
+            file.write('console.log("like");\n' * 100)
+
+    def collect(self):
+        with override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """Статика получает хеш в имени и сжатую копию."""
+        self.collect()
+        with override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        ):
+            url = static('js/like.js')
+        self.assertRegex(url, r'^/static/js/like\.[0-9a-f]{12}\.js$')
+        path = os.path.join(self.root, url[len('/static/'):])
+        with gzip.open(path + '.gz', 'rt') as compressed, open(path) as file:
+            self.assertEqual(compressed.read(), file.read())
+
+    def test_static_without_manifest(self):
+        """Без collectstatic ссылки на статику ведут на исходные файлы."""
+        with override_settings(STATIC_ROOT=self.root):
+            self.assertEqual(static('js/like.js'), '/static/js/like.js')
+
+    def test_static_served_with_cache_headers(self):
+        """Хешированная статика отдаётся сжатой и с долгим кешем."""
+        self.collect()
+        with override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        ):
+            url = static('js/like.js')
+            client = Client()
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('javascript', response['Content-Type'])
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            response.close()
+
+            response = client.get(
+                url,
+                HTTP_ACCEPT_ENCODING='gzip',
+                HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+            response = client.get('/static/js/like.js')
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+            response.close()
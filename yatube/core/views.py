@@ -1,8 +1,14 @@
 # core/views.py
 from django.shortcuts import render
 
-from django.core.mail import EmailMessage
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
 from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
+
+from core.cache import check_caches
+from core.mail import queue_mail
 
 
 def page_not_found(request, exception):
@@ -21,6 +27,21 @@ def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
 
 
+def cache_health(request):
+    """Состояние кэшей: для staff или с токеном HEALTH_CHECK_TOKEN."""
+    token = settings.HEALTH_CHECK_TOKEN
+    if not (request.user.is_staff or token and constant_time_compare(
+        request.META.get('HTTP_X_HEALTH_TOKEN', ''), token
+    )):
+        raise PermissionDenied
+    caches = check_caches()
+    healthy = all(state['ok'] for state in caches.values())
+    return JsonResponse(
+        {'healthy': healthy, 'caches': caches},
+        status=200 if healthy else 503
+    )
+
+
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -36,6 +57,4 @@ def registrarion_send_mail(mail, username):
     to = mail
     html_message = render_to_string(
         'mail/email_template.html', context={'username': username})
-    msg = EmailMessage(subject, html_message, from_email, [to])
-    msg.content_subtype = 'html'
-    msg.send()
\ No newline at end of file
+    queue_mail(subject, html_message, [to], from_email, html=True)
\ No newline at end of file
@@ -0,0 +1,214 @@
+# core/visitors.py
+"""
+Отложенная запись посетителей сайта.
+
+Вместо exists() + create() на каждый запрос ip-адреса копятся
+в ограниченном буфере процесса и пачкой записываются фоновым потоком.
+При сбросе пополняется дневная статистика посещаемости.
+В режиме VISITORS_COUNTER = 'hll' ip-адреса не хранятся, а уникальные
+посетители оцениваются скетчами HyperLogLog фиксированного размера.
+Тот же поток периодически переносит просмотры постов в их счётчики.
+"""
+import atexit
+import datetime
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+
+from core.cache import COUNTERS
+from core.views import get_client_ip
+from posts.models import (DailyViewStats, DailyVisitor, DailyVisitStats, Ip,
+                          PostView, VisitorSketch)
+
+logger = logging.getLogger(__name__)
+
+# Режимы счётчика: точный (таблица Ip) и HyperLogLog
+EXACT = 'exact'
+HLL = 'hll'
+
+
+class VisitBuffer:
+    """Потокобезопасный ограниченный буфер ip-адресов с фоновым сбросом."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+    @property
+    def flush_interval(self):
+        return settings.VISITORS_FLUSH_INTERVAL
+
+    @property
+    def max_size(self):
+        return settings.VISITORS_BUFFER_SIZE
+
+    def add(self, ip, view_name=''):
+        """Ставит посещение в очередь; при переполнении новые ip теряются."""
+        if not ip:
+            return
+        with self._lock:
+            if ip not in self._pending and len(self._pending) >= self.max_size:
+                self.dropped += 1
+                self._wakeup.set()
+                return
+            self._pending.setdefault(ip, Counter())[view_name] += 1
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def drain(self):
+        """Забирает накопленные посещения и очищает буфер."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending):
+        """Возвращает несохранённые посещения в буфер в пределах лимита."""
+        with self._lock:
+            for ip, hits in pending.items():
+                if ip in self._pending:
+                    self._pending[ip] += hits
+                elif len(self._pending) < self.max_size:
+                    self._pending[ip] = hits
+                else:
+                    self.dropped += 1
+
+    def flush(self):
+        """Записывает накопленные посещения одной пачкой."""
+        pending = self.drain()
+        if not pending:
+            return 0
+        try:
+            write_visits(pending)
+        except Exception:
+            logger.exception('Не удалось записать посетителей')
+            self.restore(pending)
+            return 0
+        return len(pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='visits-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+            aggregate_post_views()
+            connection.close()
+
+
+def write_visits(pending):
+    """Сохраняет посещения способом, выбранным в VISITORS_COUNTER."""
+    with transaction.atomic():
+        if settings.VISITORS_COUNTER == HLL:
+            write_sketches(datetime.date.today(), pending)
+        else:
+            write_ips(datetime.date.today(), pending)
+
+
+def write_ips(date, pending):
+    """
+    Точный режим: новые ip-адреса пишутся одним INSERT с игнорированием
+    дублей, уникальные за день считаются по таблице DailyVisitor.
+    Кэш только избавляет от повторной вставки уже учтённых ip.
+    """
+    known = set(
+        Ip.objects.filter(ip__in=pending).values_list('ip', flat=True)
+    )
+    Ip.objects.bulk_create(
+        (Ip(ip=ip) for ip in pending), ignore_conflicts=True
+    )
+    keys = {f'visits:{date}:{ip}': ip for ip in pending}
+    seen = caches[COUNTERS].get_many(keys)
+    fresh = [ip for key, ip in keys.items() if key not in seen]
+    DailyVisitor.objects.bulk_create(
+        (DailyVisitor(date=date, ip=ip) for ip in fresh),
+        ignore_conflicts=True
+    )
+    caches[COUNTERS].set_many(
+        {key: True for key in keys.keys() - seen.keys()}, 60 * 60 * 24
+    )
+    DailyVisitor.objects.filter(date__lt=date).delete()
+    stats = DailyVisitStats.objects.for_day(date)
+    record_daily_stats(
+        stats,
+        pending,
+        unique_visitors=DailyVisitor.objects.filter(date=date).count(),
+        new_visitors=F('new_visitors') + len(pending) - len(known),
+        total_visitors=F('total_visitors') + len(pending) - len(known),
+    )
+
+
+def write_sketches(date, pending):
+    """
+    Приближённый режим: ip-адреса не хранятся, а добавляются
+    в скетчи HyperLogLog за день и за всё время.
+    """
+    _, day_unique = VisitorSketch.add(date.isoformat(), pending)
+    all_before, all_unique = VisitorSketch.add(VisitorSketch.ALL, pending)
+    stats = DailyVisitStats.objects.for_day(date)
+    record_daily_stats(
+        stats,
+        pending,
+        unique_visitors=day_unique,
+        new_visitors=F('new_visitors') + max(all_unique - all_before, 0),
+        total_visitors=all_unique,
+    )
+
+
+def record_daily_stats(stats, pending, **visitors):
+    """Инкрементально обновляет дневную статистику посещаемости."""
+    views = Counter()
+    for hits in pending.values():
+        views.update(hits)
+
+    DailyVisitStats.objects.filter(pk=stats.pk).update(
+        page_views=F('page_views') + sum(views.values()),
+        **visitors
+    )
+    DailyViewStats.objects.bulk_create(
+        (DailyViewStats(stats=stats, view_name=name) for name in views),
+        ignore_conflicts=True
+    )
+    for name, hits in views.items():
+        DailyViewStats.objects.filter(stats=stats, view_name=name).update(
+            page_views=F('page_views') + hits
+        )
+
+
+def aggregate_post_views():
+    """Периодически переносит просмотры постов в их счётчики."""
+    try:
+        return PostView.objects.aggregate_into_posts()
+    except Exception:
+        logger.exception('Не удалось учесть просмотры постов')
+        return 0
+
+
+visits = VisitBuffer()
+atexit.register(visits.flush)
+
+
+def track_visit(request):
+    """Учитывает посетителя запроса без записи в БД на пути запроса."""
+    match = request.resolver_match
+    visits.add(get_client_ip(request), match.view_name if match else '')
@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'locked_by',
+        'locked_until',
+        'updated',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created', 'updated')
+    actions = ('retry_jobs',)
+    empty_value_display = '-пусто-'
+
+    def retry_jobs(self, request, queryset):
+        for job in queryset:
+            job.retry()
+        self.message_user(request, f'Возвращено в очередь: {len(queryset)}')
+    retry_jobs.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,35 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза (сек.) между проверками пустой очереди.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи один раз и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['poll'])
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: worker.stop())
+            self.stdout.write(f'Обработчик {worker.name} запущен')
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработчик {worker.name} остановлен'
+        ))
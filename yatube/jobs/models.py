@@ -0,0 +1,130 @@
+import datetime
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import CreatedModel
+
+
+class JobQuerySet(models.QuerySet):
+    def claim(self, worker, limit):
+        """
+        Забирает до limit готовых задач для worker. Задача становится
+        невидимой для других обработчиков на JOBS_VISIBILITY_TIMEOUT сек.;
+        если обработчик не успел (упал), её заберут снова.
+        """
+        now = timezone.now()
+        timeout = settings.JOBS_VISIBILITY_TIMEOUT
+        expired = Q(status=Job.RUNNING, locked_until__lt=now)
+        self.filter(expired, attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED,
+            last_error='Превышено время выполнения',
+            updated=now,
+        )
+        ready = Q(status=Job.QUEUED, run_at__lte=now) | expired
+        with transaction.atomic():
+            ids = list(
+                self.filter(ready).order_by('run_at')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            # Условный UPDATE: задачу, уже взятую другим, не перехватим
+            self.filter(ready, pk__in=ids).update(
+                status=Job.RUNNING,
+                locked_by=worker,
+                locked_until=now + datetime.timedelta(seconds=timeout),
+                attempts=F('attempts') + 1,
+                updated=now,
+            )
+        return list(
+            self.filter(pk__in=ids, status=Job.RUNNING, locked_by=worker)
+        )
+
+
+class Job(CreatedModel):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='[[], {}]')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=5)
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Занята до',
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    updated = models.DateTimeField('Изменена', auto_now=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+    def _locked(self):
+        """Задача всё ещё принадлежит взявшему её обработчику."""
+        return Job.objects.filter(
+            pk=self.pk,
+            status=Job.RUNNING,
+            locked_by=self.locked_by,
+            attempts=self.attempts,
+        )
+
+    def finish(self):
+        self._locked().update(
+            status=Job.DONE, locked_until=None, updated=timezone.now()
+        )
+
+    def fail(self, error):
+        """Откладывает повтор с растущей задержкой или отмечает ошибку."""
+        now = timezone.now()
+        if self.attempts >= self.max_attempts:
+            self._locked().update(
+                status=Job.FAILED, last_error=error, updated=now
+            )
+            return
+        delay = settings.JOBS_RETRY_DELAY
+        self._locked().update(
+            status=Job.QUEUED,
+            run_at=now + datetime.timedelta(
+                seconds=delay * 2 ** (self.attempts - 1)
+            ),
+            locked_until=None,
+            last_error=error,
+            updated=now,
+        )
+
+    def retry(self):
+        """Возвращает задачу в очередь с новым запасом попыток."""
+        Job.objects.filter(pk=self.pk).update(
+            status=Job.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_until=None,
+            updated=timezone.now(),
+        )
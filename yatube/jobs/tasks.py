@@ -0,0 +1,63 @@
+# jobs/tasks.py
+"""
+Регистрация фоновых задач.
+
+    @task
+    def fan_out_post(post_id): ...
+
+    fan_out_post.delay(post.pk)
+
+delay() пишет задачу в таблицу Job в текущей транзакции, поэтому
+задача видна обработчику только после её фиксации. Аргументы
+сериализуются в JSON. При JOBS_EAGER задача выполняется сразу.
+"""
+import functools
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Зарегистрированные задачи по имени «модуль.функция»
+registry = {}
+
+
+class Task:
+    def __init__(self, func, max_attempts=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь."""
+        return self.schedule(None, *args, **kwargs)
+
+    def schedule(self, run_at, *args, **kwargs):
+        """
+        Ставит задачу в очередь с выполнением не раньше run_at.
+        При JOBS_EAGER отложенная задача не выполняется.
+        """
+        if settings.JOBS_EAGER:
+            if run_at is None or run_at <= timezone.now():
+                self.func(*args, **kwargs)
+            return None
+        return Job.objects.create(
+            name=self.name,
+            payload=json.dumps([args, kwargs]),
+            max_attempts=self.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            run_at=run_at or timezone.now(),
+        )
+
+
+def task(func=None, *, max_attempts=None):
+    """Декоратор, регистрирующий функцию как фоновую задачу."""
+    if func is None:
+        return functools.partial(task, max_attempts=max_attempts)
+    registered = Task(func, max_attempts)
+    registry[registered.name] = registered
+    return registered
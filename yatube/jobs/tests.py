@@ -0,0 +1,74 @@
+# jobs/tests.py
+import datetime
+import json
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.tasks import registry, task
+from jobs.worker import execute
+
+calls = []
+
+
+@task(max_attempts=2)
+def remember(value):
+    if value == 'ошибка':
+        raise ValueError(value)
+    calls.append(value)
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_enqueues_and_worker_runs(self):
+        """Задача ставится в очередь и выполняется обработчиком."""
+        job = remember.delay('привет')
+        self.assertEqual(calls, [])
+        self.assertEqual(json.loads(job.payload), [['привет'], {}])
+        self.assertIn(job.name, registry)
+        claimed = Job.objects.claim('worker', 10)
+        self.assertEqual(claimed, [job])
+        execute(claimed[0])
+        job.refresh_from_db()
+        self.assertEqual(calls, ['привет'])
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    def test_failed_job_retried_then_failed(self):
+        """Ошибка откладывает повтор, после последней попытки — FAILED."""
+        job = remember.delay('ошибка')
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            execute(Job.objects.claim('worker', 1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+        self.assertEqual(Job.objects.claim('worker', 1), [])
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            execute(Job.objects.claim('worker', 1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_visibility_timeout(self):
+        """Задача упавшего обработчика достаётся другому по таймауту."""
+        remember.delay('привет')
+        first = Job.objects.claim('first', 1)[0]
+        self.assertEqual(Job.objects.claim('second', 1), [])
+        Job.objects.filter(pk=first.pk).update(
+            locked_until=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        second = Job.objects.claim('second', 1)[0]
+        execute(first)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+        execute(second)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        self.assertIsNone(remember.delay('сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,73 @@
+# jobs/worker.py
+"""
+Обработчик очереди задач: основной поток забирает готовые задачи
+из БД, пул потоков их выполняет. У каждого потока своё соединение с БД.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection
+
+from jobs.models import Job
+from jobs.tasks import registry
+
+logger = logging.getLogger(__name__)
+
+
+def execute(job):
+    """Выполняет задачу и записывает результат."""
+    try:
+        args, kwargs = json.loads(job.payload)
+        registry[job.name](*args, **kwargs)
+    except Exception:
+        logger.exception(
+            'Задача %s (%s) завершилась ошибкой', job.pk, job.name
+        )
+        job.fail(traceback.format_exc())
+    else:
+        job.finish()
+
+
+def execute_in_thread(job):
+    close_old_connections()
+    try:
+        execute(job)
+    finally:
+        connection.close()
+
+
+class Worker:
+    def __init__(self, concurrency, poll_interval, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self._stopping = threading.Event()
+        self._running = set()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self, once=False):
+        """Обрабатывает очередь до stop(); с once — одну выборку задач."""
+        jobs = []
+        with ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix='jobs'
+        ) as executor:
+            while not self._stopping.is_set():
+                self._running = {
+                    future for future in self._running if not future.done()
+                }
+                free = self.concurrency - len(self._running)
+                jobs = Job.objects.claim(self.name, free) if free > 0 else []
+                for job in jobs:
+                    self._running.add(executor.submit(execute_in_thread, job))
+                if once:
+                    break
+                if not jobs:
+                    self._stopping.wait(self.poll_interval)
+        return len(jobs)
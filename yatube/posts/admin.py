@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Ip, Like, Post
+from .models import (Comment, DailyViewStats, DailyVisitStats, Follow, Group,
+                     Ip, Like, Post)
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,6 +12,9 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
         'image',
+        'views_total',
+        'likes_total',
+        'comments_total',
     )
     list_editable = ('group',)
     search_fields = ('text',)
@@ -58,7 +62,6 @@ class IpAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
         'ip',
-        'post_views',
         'created',
     )
     search_fields = ('ip',)
@@ -68,17 +71,37 @@ class IpAdmin(admin.ModelAdmin):
 class LikeAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
-        'like',
+        'post',
         'user',
-        'created',
+        'active',
+        'updated',
     )
     search_fields = ('user',)
     list_filter = ('user',)
     empty_value_display = '-пусто-'
 
+
+class DailyViewStatsInline(admin.TabularInline):
+    model = DailyViewStats
+    extra = 0
+
+
+class DailyVisitStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'date',
+        'unique_visitors',
+        'new_visitors',
+        'total_visitors',
+        'page_views',
+    )
+    list_filter = ('date',)
+    inlines = (DailyViewStatsInline,)
+    empty_value_display = '-пусто-'
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Ip, IpAdmin)
 admin.site.register(Like, LikeAdmin)
+admin.site.register(DailyVisitStats, DailyVisitStatsAdmin)
@@ -0,0 +1,83 @@
+# posts/cards.py
+"""
+Версии закэшированных карточек постов.
+
+Карточка в ленте кэшируется фрагментом с ключом из id поста и версии;
+версия складывается из версий поста, автора (имя, счётчик подписчиков)
+и группы, а меняется сигналами при изменении данных карточки.
+"""
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+
+from core.cache import FEED
+from posts.likes import liked_post_ids
+
+
+def post_key(post_id):
+    return f'card:post:{post_id}'
+
+
+def author_key(author_id):
+    return f'card:author:{author_id}'
+
+
+def group_key(group_id):
+    return f'card:group:{group_id}'
+
+
+def new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def prepare_cards(posts, user):
+    """Проставляет постам страницы версию карточки и признак лайка."""
+    posts = list(posts)
+    if not posts:
+        return posts
+    liked = liked_post_ids(user, [post.pk for post in posts])
+    cache = caches[FEED]
+    keys = {post_key(post.pk) for post in posts}
+    keys |= {author_key(post.author_id) for post in posts}
+    keys |= {group_key(post.group_id) for post in posts if post.group_id}
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    for post in posts:
+        post.card_version = '{}.{}.{}'.format(
+            versions[post_key(post.pk)],
+            versions[author_key(post.author_id)],
+            versions[group_key(post.group_id)] if post.group_id else '',
+        )
+        post.is_liked = post.pk in liked
+    return posts
+
+
+def _bump(keys):
+    caches[FEED].set_many({key: new_version() for key in keys}, None)
+
+
+def _bump_now_and_on_commit(keys):
+    # Вторая смена версии после коммита не даёт параллельному запросу
+    # закэшировать карточку со счётчиками из ещё не завершённой транзакции
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_posts(*post_ids):
+    """Сбрасывает карточки постов."""
+    if post_ids:
+        _bump_now_and_on_commit([post_key(post_id) for post_id in post_ids])
+
+
+def invalidate_author(author_id):
+    """Сбрасывает все карточки постов автора."""
+    _bump_now_and_on_commit([author_key(author_id)])
+
+
+def invalidate_group(group_id):
+    """Сбрасывает все карточки постов группы."""
+    _bump_now_and_on_commit([group_key(group_id)])
@@ -1,6 +1,8 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
 from posts.models import Comment, Post
+from posts.uploads import normalize_image
 
 
 class PostForm(ModelForm):
@@ -8,6 +10,13 @@ class PostForm(ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['group'].empty_label = 'Категория не выбрана'
 
+    def clean_image(self):
+        """Новую картинку уменьшаем и пересохраняем."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return normalize_image(image)
+        return image
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
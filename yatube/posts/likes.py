@@ -0,0 +1,46 @@
+# posts/likes.py
+"""
+Лайки пользователя для карточек страницы.
+
+Проверяются только посты текущей страницы: признак «лайкнул ли» хранится
+в кэше отдельно для каждой пары (пользователь, пост), поэтому стоимость
+не зависит от истории лайков пользователя.
+"""
+from django.core.cache import caches
+
+from core.cache import FEED
+from posts.models import Like
+
+LIKED_TTL = 60 * 60 * 24
+
+
+def like_key(user_id, post_id):
+    return f'liked:{user_id}:{post_id}'
+
+
+def liked_post_ids(user, post_ids):
+    """Множество id из post_ids, которые пользователь лайкнул."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    cache = caches[FEED]
+    keys = {like_key(user.pk, post_id): post_id for post_id in post_ids}
+    flags = cache.get_many(keys)
+    missing = [post_id for key, post_id in keys.items() if key not in flags]
+    if missing:
+        liked = set(
+            Like.objects.filter(
+                post_id__in=missing, user=user, active=True
+            ).values_list('post_id', flat=True)
+        )
+        fetched = {
+            like_key(user.pk, post_id): post_id in liked
+            for post_id in missing
+        }
+        cache.set_many(fetched, LIKED_TTL)
+        flags.update(fetched)
+    return {post_id for key, post_id in keys.items() if flags[key]}
+
+
+def remember_like(user_id, post_id, liked):
+    """Обновляет закэшированный признак лайка после переключения."""
+    caches[FEED].set(like_key(user_id, post_id), liked, LIKED_TTL)
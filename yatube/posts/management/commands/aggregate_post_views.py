@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import PostView
+
+
+class Command(BaseCommand):
+    help = 'Переносит новые просмотры постов в счётчик Post.views_total.'
+
+    def handle(self, *args, **options):
+        counted = PostView.objects.aggregate_into_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено просмотров: {counted}'
+        ))
@@ -0,0 +1,136 @@
+import os
+import posixpath
+import re
+import time
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.models import StoredFile
+from posts.models import Post
+
+# Копия картинки: renditions/<имя без расширения>_<ширина>.<формат>
+RENDITION = re.compile(r'^renditions/(?P<stem>.+)_\d+\.\w+$')
+# Загруженные картинки лежат в posts/<2 hex>/ (core.storage); прочие
+# файлы posts/, например заглушка posts/no_image.jpg, не трогаем
+HASHED_DIRECTORY = re.compile(r'^[0-9a-f]{2}$')
+# Сколько имён копий проверять одним запросом
+STEMS_PER_QUERY = 500
+
+
+def walk(root, directory):
+    """Файлы каталога directory внутри root; список целиком не строится."""
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            name = posixpath.join(directory, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry.stat().st_mtime
+
+
+def hashed_files(root, directory):
+    """Файлы подкаталогов directory с именами вида <2 hex>."""
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if (entry.is_dir(follow_symlinks=False)
+                    and HASHED_DIRECTORY.match(entry.name)):
+                yield from walk(root, posixpath.join(directory, entry.name))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def referenced_images(names):
+    return set(
+        Post.objects.filter(image__in=names)
+        .values_list('image', flat=True)
+    )
+
+
+def referenced_stems(stems):
+    referenced = set()
+    # Длинное OR упирается в предел глубины выражения SQLite (1000)
+    for chunk in batches(stems, STEMS_PER_QUERY):
+        images = Post.objects.filter(
+            reduce(or_, (Q(image__startswith=f'{stem}.') for stem in chunk))
+        ).values_list('image', flat=True)
+        referenced.update(posixpath.splitext(image)[0] for image in images)
+    return referenced
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из media картинки постов и копии, на которые нет ссылок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=settings.MEDIA_GC_BATCH,
+            help='Сколько файлов проверять одним запросом',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        root = default_storage.location
+        newer = time.time() - options['grace']
+        removed = 0
+        for found, find_orphans in (
+            (hashed_files(root, 'posts'), self.orphan_images),
+            (walk(root, 'renditions'), self.orphan_renditions),
+        ):
+            files = (name for name, mtime in found if mtime < newer)
+            for batch in batches(files, options['batch']):
+                orphans = find_orphans(batch)
+                removed += len(orphans)
+                if options['dry_run']:
+                    for name in orphans:
+                        self.stdout.write(name)
+                    continue
+                for name in orphans:
+                    default_storage.delete(name)
+                StoredFile.objects.filter(
+                    name__in=orphans, references=0
+                ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов без ссылок: {removed}'
+        ))
+
+    def orphan_images(self, names):
+        referenced = referenced_images(names)
+        return [name for name in names if name not in referenced]
+
+    def orphan_renditions(self, names):
+        stems = {}
+        for name in names:
+            match = RENDITION.match(name)
+            # Посторонние файлы в renditions/ тоже считаются мусором
+            stems[name] = match.group('stem') if match else None
+        referenced = referenced_stems(
+            {stem for stem in stems.values() if stem}
+        ) if any(stems.values()) else set()
+        return [name for name, stem in stems.items() if stem not in referenced]
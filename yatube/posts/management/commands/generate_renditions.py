@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.renditions import is_current
+from posts.tasks import generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Ставит построение уменьшенных копий для картинок постов без них.'
+
+    def handle(self, *args, **options):
+        queued = 0
+        posts = Post.objects.exclude(image='').only(
+            'pk', 'image', 'renditions'
+        )
+        for post in posts.iterator():
+            if not is_current(post):
+                generate_renditions.delay(post.pk)
+                queued += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Поставлено в очередь: {queued}'
+        ))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.tasks import backfill_timelines
+from users.models import Profile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов '
+        '(просмотры, лайки, комментарии) и подписчиков авторов.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Profile.objects.bulk_create(
+                Profile(user=user)
+                for user in User.objects.filter(profile__isnull=True)
+            )
+            limit = settings.TIMELINE_FANOUT_LIMIT
+            popular = list(Profile.objects.filter(
+                followers_total__gte=limit
+            ).values_list('user_id', flat=True))
+            posts = Post.objects.recount_totals()
+            profiles = Profile.objects.recount_totals()
+            # Счётчик расходился с подписками: авторам, которые на деле
+            # не популярны, рассылаем посты по лентам подписчиков
+            for author_id in Profile.objects.filter(
+                user_id__in=popular, followers_total__lt=limit
+            ).values_list('user_id', flat=True):
+                backfill_timelines.delay(author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, профилей: {profiles}'
+        ))
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, group_by):
+    counted = (
+        queryset.order_by()
+        .values(group_by)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def fill_totals(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    Comment = apps.get_model('posts', 'Comment')
+    Post.objects.update(
+        views_total=count_subquery(
+            Post.views.through.objects.filter(post=OuterRef('pk')), 'post'
+        ),
+        likes_total=count_subquery(
+            Like.objects.filter(post_like=OuterRef('pk'), like=True),
+            'post_like'
+        ),
+        comments_total=count_subquery(
+            Comment.objects.filter(post=OuterRef('pk')), 'post'
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_auto_20220121_0114'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Комментарии'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Лайки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='views_total',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Просмотры'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ips(apps, schema_editor):
+    Ip = apps.get_model('posts', 'Ip')
+    PostViews = apps.get_model('posts', 'Post').views.through
+    duplicates = (
+        Ip.objects.values('ip')
+        .annotate(first=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        extra = Ip.objects.filter(ip=row['ip']).exclude(id=row['first'])
+        seen = set(
+            PostViews.objects.filter(ip_id=row['first'])
+            .values_list('post_id', flat=True)
+        )
+        for post_id in (
+            PostViews.objects.filter(ip__in=extra)
+            .values_list('post_id', flat=True).distinct()
+        ):
+            if post_id not in seen:
+                PostViews.objects.create(post_id=post_id, ip_id=row['first'])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_auto_20261018_1648'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ips, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ip',
+            name='ip',
+            field=models.GenericIPAddressField(unique=True),
+        ),
+    ]
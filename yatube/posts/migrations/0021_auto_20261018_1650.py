@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_auto_20261018_1649'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ip',
+            index=models.Index(fields=['created'], name='posts_ip_created_4def05_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:51
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    Ip = apps.get_model('posts', 'Ip')
+    DailyVisitStats = apps.get_model('posts', 'DailyVisitStats')
+    days = (
+        Ip.objects.annotate(day=TruncDate('created'))
+        .values('day')
+        .annotate(new=Count('id'))
+        .order_by('day')
+    )
+    total = 0
+    rows = []
+    for day in days:
+        total += day['new']
+        rows.append(DailyVisitStats(
+            date=day['day'],
+            unique_visitors=day['new'],
+            new_visitors=day['new'],
+            total_visitors=total,
+            page_views=day['new'],
+        ))
+    DailyVisitStats.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_auto_20261018_1650'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('unique_visitors', models.PositiveIntegerField(default=0, verbose_name='Уникальные посетители')),
+                ('new_visitors', models.PositiveIntegerField(default=0, verbose_name='Новые посетители')),
+                ('total_visitors', models.PositiveIntegerField(default=0, verbose_name='Посетители за всё время')),
+                ('page_views', models.PositiveIntegerField(default=0, verbose_name='Просмотры страниц')),
+            ],
+            options={
+                'verbose_name': 'Посещаемость за день',
+                'verbose_name_plural': 'Посещаемость по дням',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyViewStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=100, verbose_name='Страница')),
+                ('page_views', models.PositiveIntegerField(default=0, verbose_name='Просмотры страницы')),
+                ('stats', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='views', to='posts.DailyVisitStats', verbose_name='День')),
+            ],
+            options={
+                'verbose_name': 'Просмотры страницы за день',
+                'verbose_name_plural': 'Просмотры страниц за день',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyviewstats',
+            constraint=models.UniqueConstraint(fields=('stats', 'view_name'), name='unique_bundle_stats_view_name'),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
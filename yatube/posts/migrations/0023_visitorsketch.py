@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_auto_20261018_1651'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitorSketch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=10, unique=True, verbose_name='Период')),
+                ('registers', models.BinaryField(verbose_name='Регистры')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлён')),
+            ],
+            options={
+                'verbose_name': 'Скетч посетителей',
+                'verbose_name_plural': 'Скетчи посетителей',
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.crypto import salted_hmac
+
+
+def copy_post_views(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostView = apps.get_model('posts', 'PostView')
+    links = Post.views.through.objects.values_list('post_id', 'ip__ip')
+    PostView.objects.bulk_create(
+        (
+            PostView(
+                post_id=post_id,
+                ip_hash=salted_hmac('posts.PostView', ip).hexdigest(),
+                aggregated=True,
+            )
+            for post_id, ip in links.iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_visitorsketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostView',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_hash', models.CharField(max_length=40, verbose_name='Хэш ip')),
+                ('aggregated', models.BooleanField(db_index=True, default=False, verbose_name='Учтён в счётчике')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_views', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Просмотр поста',
+                'verbose_name_plural': 'Просмотры постов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postview',
+            constraint=models.UniqueConstraint(fields=('post', 'ip_hash'), name='unique_bundle_post_ip_hash'),
+        ),
+        migrations.RunPython(copy_post_views, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='views',
+        ),
+    ]
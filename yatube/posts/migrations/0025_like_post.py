@@ -0,0 +1,87 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def link_likes_to_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    links = Post.like.through.objects.values_list('post_id', 'like_id')
+    for post_id, like_id in links.iterator():
+        like = Like.objects.get(pk=like_id)
+        if like.post_id is None:
+            Like.objects.filter(pk=like_id).update(post_id=post_id)
+        else:
+            like.pk = None
+            like.post_id = post_id
+            like.save()
+    Like.objects.filter(post__isnull=True).delete()
+    duplicates = (
+        Like.objects.values('post', 'user')
+        .annotate(last=Max('id'))
+        .values_list('post', 'user', 'last')
+    )
+    for post_id, user_id, last_id in duplicates:
+        Like.objects.filter(post_id=post_id, user_id=user_id).exclude(
+            pk=last_id
+        ).delete()
+    # 0019 считала лайки по связям до удаления дублей: пересчитываем
+    active_likes = (
+        Like.objects.filter(post=OuterRef('pk'), active=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    Post.objects.update(likes_total=Coalesce(
+        Subquery(active_likes, output_field=IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_auto_20261018_1653'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='like',
+            old_name='like',
+            new_name='active',
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='active',
+            field=models.BooleanField(default=True, verbose_name='Активен'),
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='post',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменён'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(link_likes_to_posts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='like',
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_bundle_post_user_like'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0028_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('ip', models.GenericIPAddressField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyvisitor',
+            constraint=models.UniqueConstraint(fields=('date', 'ip'), name='unique_bundle_date_ip_visitor'),
+        ),
+    ]
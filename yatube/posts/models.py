@@ -1,13 +1,77 @@
+import datetime
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.template.defaultfilters import slugify
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
 
+from core.hyperloglog import HyperLogLog
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
+# Просмотры постов перенесены в Post.views_total (аргумент post_ids)
+post_views_aggregated = Signal()
+# Лайк переключён (аргументы post_id, user_id, active)
+like_toggled = Signal()
+
+
+def count_subquery(queryset, group_by):
+    """Коррелированный подзапрос COUNT(*) для аннотации."""
+    counted = (
+        queryset.order_by()
+        .values(group_by)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_counters(self):
+        """
+        Набор постов для ленты: автор с профилем (счётчик подписчиков),
+        группа и денормализованные счётчики карточки одним запросом.
+        """
+        return self.select_related('author__profile', 'group')
+
+    def recount_totals(self):
+        """Пересчитывает денормализованные счётчики одним UPDATE."""
+        return self.update(
+            views_total=count_subquery(
+                PostView.objects.filter(post=OuterRef('pk')), 'post'
+            ),
+            likes_total=count_subquery(
+                Like.objects.filter(post=OuterRef('pk'), active=True), 'post'
+            ),
+            comments_total=count_subquery(
+                Comment.objects.filter(post=OuterRef('pk')), 'post'
+            ),
+        )
+
+    def timeline(self, user):
+        """
+        Лента подписок: посты из материализованной ленты пользователя
+        и, при чтении, посты популярных авторов, которым ленты не рассылаются.
+        """
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        popular = Follow.objects.filter(
+            user=user, author__profile__followers_total__gte=limit
+        )
+        return self.filter(
+            Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+            | Q(author__in=popular.values('author'))
+        )
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -34,23 +98,41 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
-    views = models.ManyToManyField(
-        'Ip',
-        related_name="post_views",
-        blank=True
+    renditions = models.TextField(
+        'Копии картинки',
+        blank=True,
+        editable=False,
+        help_text='Карта уменьшенных копий картинки (JSON)'
     )
-    like = models.ManyToManyField(
-        'Like',
-        related_name='post_like',
-        blank=True
+    views_total = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        db_index=True
+    )
+    likes_total = models.PositiveIntegerField(
+        'Лайки',
+        default=0
     )
+    comments_total = models.PositiveIntegerField(
+        'Комментарии',
+        default=0
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Курсорная пагинация лент идёт по (pub_date, id) по убыванию
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date', '-id']),
+        ]
 
     def get_absolute_url(self):
         return reverse('posts:profile', args=[self.author.username])
@@ -58,11 +140,15 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:15]
 
-    def views_count(self):
-        return self.views.count()
-
-    def like_count(self):
-        return self.like.filter(like=True).count()
+    def increment(self, field, delta=1):
+        """
+        Атомарно изменяет денормализованный счётчик поста.
+        Счётчик не уходит в минус, если успел разойтись с данными.
+        """
+        posts = Post.objects.filter(pk=self.pk)
+        if delta < 0:
+            posts = posts.filter(**{f'{field}__gte': -delta})
+        posts.update(**{field: F(field) + delta})
 
 
 class Group(models.Model):
@@ -88,7 +174,7 @@ class Group(models.Model):
                 )
             )
             self.slug = slugify(new_slug)[:200]
-        if Group.objects.filter(slug=self.slug).exists():
+        if Group.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
             raise ValidationError(
                 f'Адрес "{self.slug}" уже существует, '
                 'придумайте уникальное значение'
@@ -154,22 +240,445 @@ class Follow(CreatedModel):
         return reverse('posts:follow_index')
 
 
+class TimelineQuerySet(models.QuerySet):
+    def fan_out(self, post):
+        """
+        Добавляет новый пост в ленты подписчиков автора. Популярным
+        авторам ленты не рассылаются: их посты подмешиваются при чтении.
+        Ленты обрезаются периодически (trim_all), а не на каждый пост.
+        """
+        followers = Follow.objects.filter(author_id=post.author_id).filter(
+            author__profile__followers_total__lt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in followers.iterator()
+            ),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+
+    def backfill(self, author_id, user_ids):
+        """
+        Добавляет в ленты подписчиков user_ids последние посты автора:
+        при подписке и когда автор перестал быть популярным.
+        """
+        posts = list(Post.objects.filter(author_id=author_id).filter(
+            author__profile__followers_total__lt=settings.TIMELINE_FANOUT_LIMIT
+        ).order_by('-pub_date', '-id').values_list(
+            'pk', 'pub_date'
+        )[:settings.TIMELINE_SIZE])
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for user_id in user_ids for pk, pub_date in posts
+            ),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+        self.trim(user_ids)
+
+    def remove_author(self, user_id, author_id):
+        """Убирает из ленты посты автора после отписки."""
+        self.filter(user_id=user_id, post__author_id=author_id).delete()
+
+    def trim(self, user_ids):
+        """Оставляет в лентах пользователей TIMELINE_SIZE свежих постов."""
+        size = settings.TIMELINE_SIZE
+        oldest_kept = self.filter(user=OuterRef('user')).order_by(
+            '-pub_date', '-post_id'
+        ).values('pub_date')[size - 1:size]
+        self.filter(
+            user_id__in=user_ids, pub_date__lt=Subquery(oldest_kept)
+        ).delete()
+
+    def trim_all(self, batch_size=500):
+        """Обрезает все ленты длиннее TIMELINE_SIZE, по batch_size лент."""
+        overgrown = list(
+            self.order_by().values('user')
+            .annotate(total=Count('*'))
+            .filter(total__gt=settings.TIMELINE_SIZE)
+            .values_list('user', flat=True)
+        )
+        for start in range(0, len(overgrown), batch_size):
+            self.trim(overgrown[start:start + batch_size])
+        return len(overgrown)
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    objects = TimelineQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_bundle_user_post_timeline'
+            )
+        ]
+        indexes = [models.Index(fields=['user', '-pub_date'])]
+
+
 class Ip(CreatedModel):
-    ip = models.GenericIPAddressField()
+    ip = models.GenericIPAddressField(unique=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['created'])]
 
     def __str__(self):
         return self.ip
 
 
+class DailyVisitor(models.Model):
+    """ip-адрес, заходивший на сайт в этот день (точный режим)."""
+    date = models.DateField('Дата')
+    ip = models.GenericIPAddressField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'ip'],
+                name='unique_bundle_date_ip_visitor'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.ip}'
+
+
+class DailyVisitStatsQuerySet(models.QuerySet):
+    def for_day(self, date):
+        """
+        Строка статистики за день; новая строка наследует
+        накопленное число посетителей за всё время.
+        """
+        stats = self.filter(date=date).first()
+        if stats is None:
+            previous = self.filter(date__lt=date).order_by('-date').first()
+            stats, _ = self.get_or_create(
+                date=date,
+                defaults={
+                    'total_visitors': (
+                        previous.total_visitors if previous else 0
+                    )
+                }
+            )
+        return stats
+
+    def history(self, days=30):
+        """Статистика за последние дни для графиков посещаемости."""
+        return self.prefetch_related('views').order_by('-date')[:days]
+
+
+class DailyVisitStats(models.Model):
+    date = models.DateField('Дата', unique=True)
+    unique_visitors = models.PositiveIntegerField(
+        'Уникальные посетители',
+        default=0
+    )
+    new_visitors = models.PositiveIntegerField(
+        'Новые посетители',
+        default=0
+    )
+    total_visitors = models.PositiveIntegerField(
+        'Посетители за всё время',
+        default=0
+    )
+    page_views = models.PositiveIntegerField(
+        'Просмотры страниц',
+        default=0
+    )
+
+    objects = DailyVisitStatsQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Посещаемость за день'
+        verbose_name_plural = 'Посещаемость по дням'
+
+    def __str__(self):
+        return str(self.date)
+
+
+class DailyViewStats(models.Model):
+    stats = models.ForeignKey(
+        DailyVisitStats,
+        on_delete=models.CASCADE,
+        related_name='views',
+        verbose_name='День'
+    )
+    view_name = models.CharField('Страница', max_length=100)
+    page_views = models.PositiveIntegerField(
+        'Просмотры страницы',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Просмотры страницы за день'
+        verbose_name_plural = 'Просмотры страниц за день'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['stats', 'view_name'],
+                name='unique_bundle_stats_view_name'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.stats.date} {self.view_name}'
+
+
+class PostViewQuerySet(models.QuerySet):
+    def aggregate_into_posts(self, batch_size=500):
+        """
+        Переносит ещё не учтённые просмотры в Post.views_total.
+        Возвращает число учтённых просмотров.
+        """
+        counted = 0
+        while True:
+            with transaction.atomic():
+                # Пачку сначала забираем себе: строки, заблокированные
+                # другим процессом, пропускаются и не учитываются дважды
+                ids = list(
+                    self.filter(aggregated=False)
+                    .select_for_update(skip_locked=True)
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return counted
+                claimed = self.filter(pk__in=ids)
+                totals = list(
+                    claimed.order_by().values('post')
+                    .annotate(total=Count('*'))
+                )
+                for row in totals:
+                    Post.objects.filter(pk=row['post']).update(
+                        views_total=F('views_total') + row['total']
+                    )
+                    counted += row['total']
+                claimed.update(aggregated=True)
+            post_views_aggregated.send(
+                sender=PostView, post_ids=[row['post'] for row in totals]
+            )
+
+
+class PostView(models.Model):
+    """Просмотр поста: одна строка на пару (пост, хэш ip)."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_views',
+        verbose_name='Пост'
+    )
+    ip_hash = models.CharField('Хэш ip', max_length=40)
+    aggregated = models.BooleanField(
+        'Учтён в счётчике',
+        default=False,
+        db_index=True
+    )
+
+    objects = PostViewQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Просмотр поста'
+        verbose_name_plural = 'Просмотры постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'ip_hash'],
+                name='unique_bundle_post_ip_hash'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.ip_hash}'
+
+    @staticmethod
+    def hash_ip(ip):
+        return salted_hmac('posts.PostView', ip).hexdigest()
+
+    @classmethod
+    def record(cls, post_id, ip):
+        """Учитывает просмотр одним INSERT, повторный просмотр игнорируется."""
+        cls.objects.bulk_create(
+            [cls(post_id=post_id, ip_hash=cls.hash_ip(ip))],
+            ignore_conflicts=True
+        )
+
+
+class VisitorSketch(models.Model):
+    """
+    Скетч HyperLogLog уникальных посетителей: за день (ключ — дата
+    в ISO-формате) или за всё время (ключ ALL).
+    """
+    ALL = 'all'
+
+    key = models.CharField('Период', max_length=10, unique=True)
+    registers = models.BinaryField('Регистры')
+    updated = models.DateTimeField('Обновлён', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Скетч посетителей'
+        verbose_name_plural = 'Скетчи посетителей'
+
+    def __str__(self):
+        return self.key
+
+    @property
+    def sketch(self):
+        return HyperLogLog.from_bytes(self.registers)
+
+    @classmethod
+    def add(cls, key, values):
+        """
+        Добавляет значения в скетч периода.
+        Возвращает оценки уникальных значений до и после добавления.
+        """
+        row, _ = cls.objects.select_for_update().get_or_create(key=key)
+        sketch = row.sketch
+        before = sketch.count()
+        sketch.update(values)
+        row.registers = sketch.to_bytes()
+        row.save(update_fields=['registers', 'updated'])
+        return before, sketch.count()
+
+    @classmethod
+    def unique_between(cls, start, end):
+        """Уникальные посетители за период [start, end] слиянием дней."""
+        sketch = HyperLogLog()
+        days = (end - start).days + 1
+        keys = [
+            (start + datetime.timedelta(days=day)).isoformat()
+            for day in range(days)
+        ]
+        for registers in cls.objects.filter(key__in=keys).values_list(
+            'registers', flat=True
+        ):
+            sketch.merge(HyperLogLog.from_bytes(registers))
+        return sketch.count()
+
+
+class LikeQuerySet(models.QuerySet):
+    def toggle(self, post_id, user_id):
+        """
+        Переключает лайк одним UPSERT: первый лайк создаёт активную
+        запись, повторный — меняет её состояние. Счётчик поста меняется
+        в той же транзакции. Возвращает новое состояние и счётчик.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        posts = connection.ops.quote_name(Post._meta.db_table)
+        now = timezone.now()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} '
+                '(post_id, user_id, active, created, updated) '
+                'VALUES (%s, %s, %s, %s, %s) '
+                'ON CONFLICT (post_id, user_id) DO UPDATE SET '
+                f'active = NOT {table}.active, updated = excluded.updated '
+                'RETURNING active',
+                [post_id, user_id, True, now, now]
+            )
+            active = bool(cursor.fetchone()[0])
+            delta = 1 if active else -1
+            # Счётчик не уходит в минус, если успел разойтись с данными
+            cursor.execute(
+                f'UPDATE {posts} SET likes_total = CASE '
+                'WHEN likes_total + %s < 0 THEN 0 '
+                'ELSE likes_total + %s END '
+                'WHERE id = %s RETURNING likes_total',
+                [delta, delta, post_id]
+            )
+            likes_total = cursor.fetchone()[0]
+        like_toggled.send(
+            sender=self.model, post_id=post_id, user_id=user_id, active=active
+        )
+        return active, likes_total
+
+    def set_state(self, post_ids, user_id, active):
+        """
+        Приводит лайки пользователя к состоянию active для пачки постов.
+        Меняются только записи в противоположном состоянии, поэтому
+        повторный запрос ничего не делает. Возвращает id изменённых постов.
+        """
+        # Чтение — до транзакции: в SQLite транзакция, начатая с чтения,
+        # не может перейти к записи при параллельном запросе
+        post_ids = list(
+            Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True)
+        )
+        if not post_ids:
+            return set()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with transaction.atomic():
+            if active:
+                self.bulk_create(
+                    (self.model(post_id=post_id, user_id=user_id,
+                                active=False) for post_id in post_ids),
+                    ignore_conflicts=True
+                )
+            # Изменённые посты берутся из самого условного UPDATE
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET active = %s, updated = %s '
+                    'WHERE user_id = %s AND active = %s '
+                    f'AND post_id IN ({placeholders}) RETURNING post_id',
+                    [active, timezone.now(), user_id, not active, *post_ids]
+                )
+                changed = [post_id for post_id, in cursor.fetchall()]
+            posts = Post.objects.filter(pk__in=changed)
+            if active:
+                posts.update(likes_total=F('likes_total') + 1)
+            else:
+                posts.filter(likes_total__gt=0).update(
+                    likes_total=F('likes_total') - 1
+                )
+        for post_id in changed:
+            like_toggled.send(
+                sender=self.model, post_id=post_id, user_id=user_id,
+                active=active
+            )
+        return set(changed)
+
+
 class Like(CreatedModel):
-    like = models.BooleanField()
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пост'
+    )
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='like',
         verbose_name='Лайки'
     )
+    active = models.BooleanField('Активен', default=True)
+    updated = models.DateTimeField('Изменён', auto_now=True)
+
+    objects = LikeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Лайки'
-        verbose_name_plural = 'Лайки'
\ No newline at end of file
+        verbose_name_plural = 'Лайки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'user'],
+                name='unique_bundle_post_user_like'
+            )
+        ]
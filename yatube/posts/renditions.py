@@ -0,0 +1,154 @@
+# posts/renditions.py
+"""
+Уменьшенные копии картинок постов.
+
+Для каждого назначения (карточка, всплывающее окно) из
+POST_IMAGE_RENDITIONS строятся копии нужной ширины во всех
+поддерживаемых форматах: AVIF и WebP для современных браузеров
+и JPEG как запасной. Карта копий хранится в Post.renditions:
+
+    {"version": 2, "source": "posts/cat.jpg",
+     "width": 3000, "height": 2000,
+     "placeholder": "data:image/webp;base64,...",
+     "renditions": {"card": {"webp": [[400, 267, "renditions/..."], ...],
+                             "jpeg": [...]}, ...}}
+
+placeholder — картинка в несколько пикселей прямо в HTML: браузер
+растягивает её размытым фоном, пока грузится настоящая.
+"""
+import base64
+import io
+import json
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Формат Pillow и параметры сохранения; порядок — порядок <source>
+# в <picture>, от самого компактного формата
+FORMATS = {
+    'avif': ('AVIF', {'quality': 60}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Формат для <img>, который понимают все браузеры
+FALLBACK = 'jpeg'
+# Версия карты: карты старых версий строятся заново
+VERSION = 2
+
+
+def available_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        fmt for fmt, (pil_format, _) in FORMATS.items()
+        if fmt == FALLBACK
+        or fmt in settings.POST_IMAGE_FORMATS and pil_format in Image.SAVE
+    ]
+
+
+def load_map(post):
+    try:
+        return json.loads(post.renditions) if post.renditions else {}
+    except ValueError:
+        return {}
+
+
+def is_current(post):
+    """Карта копий построена для текущей картинки поста."""
+    rendition_map = load_map(post)
+    return (
+        bool(post.image)
+        and rendition_map.get('source') == post.image.name
+        and rendition_map.get('version') == VERSION
+    )
+
+
+def _open(field):
+    with field.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        mode = 'RGBA' if 'transparency' in image.info else 'RGB'
+        image = image.convert(mode)
+    return image
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def placeholder(image, formats):
+    """Крошечная копия картинки как data: URI."""
+    size = settings.POST_IMAGE_PLACEHOLDER_SIZE
+    tiny = image.copy()
+    tiny.thumbnail((size, size), Image.BILINEAR)
+    fmt = 'webp' if 'webp' in formats else FALLBACK
+    encoded = base64.b64encode(_encode(tiny, fmt)).decode()
+    return f'data:image/{fmt};base64,{encoded}'
+
+
+def _store(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def delete(source):
+    """Удаляет все копии картинки source."""
+    stem = posixpath.splitext(source)[0]
+    directory, prefix = posixpath.split(f'renditions/{stem}_')
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        if filename.startswith(prefix):
+            default_storage.delete(posixpath.join(directory, filename))
+
+
+def generate(post):
+    """Строит копии картинки поста и возвращает их карту."""
+    # Копии — производные файлы, поэтому лежат в обычном хранилище
+    # под именем исходной картинки
+    storage = default_storage
+    image = _open(post.image)
+    stem = posixpath.splitext(post.image.name)[0]
+    formats = available_formats()
+    stored = {}
+    renditions = {}
+    for name, widths in settings.POST_IMAGE_RENDITIONS.items():
+        renditions[name] = {fmt: [] for fmt in formats}
+        for width in sorted({min(width, image.width) for width in widths}):
+            height = max(round(image.height * width / image.width), 1)
+            resized = None
+            for fmt in formats:
+                if (width, fmt) not in stored:
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    stored[width, fmt] = _store(
+                        storage,
+                        f'renditions/{stem}_{width}.{fmt}',
+                        _encode(resized, fmt)
+                    )
+                renditions[name][fmt].append(
+                    [width, height, stored[width, fmt]]
+                )
+    return {
+        'version': VERSION,
+        'source': post.image.name,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': placeholder(image, formats),
+        'renditions': renditions,
+    }
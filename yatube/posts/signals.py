@@ -0,0 +1,121 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import StoredFile
+
+from posts.cards import invalidate_author, invalidate_group, invalidate_posts
+from posts.likes import remember_like
+from posts.models import (Comment, Follow, Group, Like, Post, PostView,
+                          TimelineEntry, like_toggled, post_views_aggregated)
+from posts.renditions import is_current
+from posts.tasks import (backfill_follower, backfill_timelines, delete_image,
+                         fan_out_post, generate_renditions)
+from users.models import Profile
+
+User = get_user_model()
+# Поля автора, которые показывает карточка поста
+CARD_AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def release_image(name):
+    """Снимает ссылку на картинку; без ссылок файл удалится позже."""
+    if name and StoredFile.objects.release(name):
+        # Пауза даёт закончиться загрузкам того же файла
+        delete_image.schedule(
+            timezone.now()
+            + datetime.timedelta(seconds=settings.MEDIA_GC_GRACE),
+            name
+        )
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._previous_image = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('image', flat=True).first()
+        if instance.pk else ''
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_changed(sender, instance, created, **kwargs):
+    if created:
+        fan_out_post.delay(instance.pk)
+    current = instance.image.name or ''
+    previous = getattr(instance, '_previous_image', current) or ''
+    if previous != current:
+        if current:
+            StoredFile.objects.acquire(current)
+        release_image(previous)
+    instance._previous_image = current
+    if instance.image and not is_current(instance):
+        generate_renditions.delay(instance.pk)
+    invalidate_posts(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        invalidate_posts(instance.post_id)
+
+
+@receiver(like_toggled, sender=Like)
+def like_changed(sender, post_id, user_id, active, **kwargs):
+    remember_like(user_id, post_id, active)
+    invalidate_posts(post_id)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login
+    if not created and (
+        update_fields is None or CARD_AUTHOR_FIELDS & set(update_fields)
+    ):
+        invalidate_author(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_group(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        Profile.increment_followers(instance.author_id)
+        backfill_follower.delay(instance.user_id, instance.author_id)
+    invalidate_author(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    # Сигнал приходит при любом удалении подписки: отписке, удалении
+    # пользователя каскадом, из админки
+    TimelineEntry.objects.remove_author(instance.user_id, instance.author_id)
+    Profile.increment_followers(instance.author_id, -1)
+    # Автор перестал быть популярным: его посты больше
+    # не подмешиваются при чтении, рассылаем их по лентам
+    if Profile.objects.filter(
+        user_id=instance.author_id,
+        followers_total=settings.TIMELINE_FANOUT_LIMIT - 1
+    ).exists():
+        backfill_timelines.delay(instance.author_id)
+    invalidate_author(instance.author_id)
+
+
+@receiver(post_views_aggregated, sender=PostView)
+def views_aggregated(sender, post_ids, **kwargs):
+    invalidate_posts(*post_ids)
@@ -0,0 +1,92 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.cache import FEED
+from core.models import StoredFile
+from jobs.tasks import task
+from posts import renditions
+from posts.cards import invalidate_posts
+from posts.models import Follow, Post, PostView, TimelineEntry
+
+# Ключ-замок: обрезку лент ставит в очередь только одна задача
+TRIM_KEY = 'timeline:trim'
+
+
+@task
+def fan_out_post(post_id):
+    """Рассылает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        TimelineEntry.objects.fan_out(post)
+        request_trim()
+
+
+@task
+def trim_timelines():
+    """Обрезает ленты подписок, выросшие больше TIMELINE_SIZE."""
+    caches[FEED].delete(TRIM_KEY)
+    TimelineEntry.objects.trim_all()
+
+
+def request_trim():
+    """Ставит обрезку лент через TIMELINE_TRIM_INTERVAL, если её нет."""
+    interval = settings.TIMELINE_TRIM_INTERVAL
+    # Замок истекает сам, если задача не выполнилась
+    if caches[FEED].add(TRIM_KEY, True, interval * 2):
+        trim_timelines.schedule(
+            timezone.now() + datetime.timedelta(seconds=interval)
+        )
+
+
+@task
+def backfill_follower(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    # Подписку могли отменить, пока задача ждала очереди
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        TimelineEntry.objects.backfill(author_id, [user_id])
+
+
+@task
+def backfill_timelines(author_id):
+    """
+    Рассылает недавние посты автора, чьи посты перестали подмешиваться
+    при чтении: подписчиков стало меньше TIMELINE_FANOUT_LIMIT.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.backfill(author_id, list(followers))
+
+
+@task
+def aggregate_post_views():
+    """Переносит новые просмотры постов в их счётчики."""
+    PostView.objects.aggregate_into_posts()
+
+
+@task
+def generate_renditions(post_id):
+    """Строит уменьшенные копии картинки поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image or renditions.is_current(post):
+        return
+    rendition_map = renditions.generate(post)
+    # Картинку могли сменить, пока строились копии
+    Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        renditions=json.dumps(rendition_map)
+    )
+    invalidate_posts(post.pk)
+
+
+@task
+def delete_image(name):
+    """Удаляет картинку и её копии, если на неё больше не ссылаются."""
+    if Post.objects.filter(image=name).exists():
+        return
+    if StoredFile.objects.discard(name):
+        Post._meta.get_field('image').storage.delete(name)
+        renditions.delete(name)
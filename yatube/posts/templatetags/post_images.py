@@ -0,0 +1,86 @@
+from django import template
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+
+from core.cache import FEED
+from posts.renditions import FALLBACK, is_current, load_map
+from posts.tasks import generate_renditions
+
+register = template.Library()
+
+NO_IMAGE = 'posts/no_image.jpg'
+# Как часто (сек.) можно заново просить копии для одной картинки
+REQUEST_TIMEOUT = 600
+
+
+def request_renditions(post):
+    """Ставит построение копий для картинки, загруженной раньше них."""
+    if caches[FEED].add(f'renditions:{post.pk}', True, REQUEST_TIMEOUT):
+        generate_renditions.delay(post.pk)
+
+
+def get_map(post):
+    """Карта копий картинки поста или None, пока её нет."""
+    if not post.image:
+        return None
+    if not is_current(post):
+        request_renditions(post)
+        return None
+    return load_map(post)
+
+
+def get_rendition(post, name):
+    """Копии картинки поста для назначения name по форматам или None."""
+    rendition_map = get_map(post)
+    return rendition_map['renditions'].get(name) if rendition_map else None
+
+
+def build_srcset(storage, variants):
+    return ', '.join(
+        f'{storage.url(path)} {width}w' for width, _, path in variants
+    )
+
+
+@register.simple_tag
+def srcset(post, name, fmt=FALLBACK):
+    """Атрибут srcset копий картинки поста в формате fmt."""
+    rendition = get_rendition(post, name)
+    if not rendition:
+        return ''
+    return build_srcset(default_storage, rendition.get(fmt, []))
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(post, name, sizes='100vw', css_class='', alt='',
+            placeholder=False):
+    """
+    <picture> с копиями картинки поста: AVIF/WebP-источники и JPEG.
+    Пока копий нет, показывается исходная картинка. width/height
+    резервируют место под картинку, placeholder=True подкладывает
+    размытую заглушку до её загрузки.
+    """
+    context = {'sizes': sizes, 'css_class': css_class, 'alt': alt}
+    rendition_map = get_map(post)
+    rendition = rendition_map and rendition_map['renditions'].get(name)
+    if not rendition:
+        context['src'] = (
+            post.image.url if post.image else default_storage.url(NO_IMAGE)
+        )
+        return context
+    fallback = rendition[FALLBACK]
+    context.update(
+        sources=[
+            {
+                'type': f'image/{fmt}',
+                'srcset': build_srcset(default_storage, variants),
+            }
+            for fmt, variants in rendition.items() if fmt != FALLBACK
+        ],
+        src=default_storage.url(fallback[0][2]),
+        srcset=build_srcset(default_storage, fallback),
+        width=rendition_map['width'],
+        height=rendition_map['height'],
+    )
+    if placeholder:
+        context['placeholder'] = rendition_map['placeholder']
+    return context
@@ -2,14 +2,23 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO, StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from core.models import StoredFile
+from posts.management.commands.collect_media import referenced_stems
 from posts.models import Comment, Group, Post
+from posts.tasks import delete_image
+from posts.templatetags.post_images import NO_IMAGE
 
 User = get_user_model()
 
@@ -316,3 +325,112 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=form_comments_create['text']).exists()
         )
+
+    @override_settings(POST_IMAGE_MAX_EDGE=100)
+    def test_create_post_image_normalized(self):
+        """Картинка уменьшается, теряет EXIF и не хранится дважды."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (600, 300), 'blue').save(buffer, 'JPEG', exif=exif)
+        images = []
+        for text in ('Первая копия', 'Вторая копия'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': text,
+                    'image': SimpleUploadedFile(
+                        'photo.jpg', buffer.getvalue(), 'image/jpeg'
+                    ),
+                },
+            )
+            images.append(Post.objects.get(text=text).image)
+        self.assertEqual(images[0].name, images[1].name)
+        with images[0].open('rb') as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_create_post_image_too_large(self):
+        """Слишком большой файл не принимается."""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'PNG')
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Большая картинка',
+                'image': SimpleUploadedFile('big.png', buffer.getvalue()),
+            },
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 10\xa0байт.'
+        )
+        self.assertFalse(Post.objects.filter(text='Большая картинка').exists())
+
+    def test_post_image_references(self):
+        """Картинка хранится один раз и удаляется без ссылок."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'green').save(buffer, 'PNG')
+        posts = []
+        for text in ('Общая картинка', 'Та же картинка'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': text,
+                    'image': SimpleUploadedFile('a.png', buffer.getvalue()),
+                },
+            )
+            posts.append(Post.objects.get(text=text))
+        name = posts[0].image.name
+        self.assertRegex(name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+
+        self.authorized_client.post(
+            reverse('posts:post_delete', kwargs={'post_id': posts[0].pk})
+        )
+        self.assertEqual(StoredFile.objects.get(name=name).references, 1)
+        delete_image(name)
+        self.assertTrue(default_storage.exists(name))
+
+        post = Post.objects.get(pk=posts[1].pk)
+        post.image = ''
+        post.save()
+        self.assertEqual(StoredFile.objects.get(name=name).references, 0)
+        delete_image(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_collect_media_removes_orphans(self):
+        """Сборщик мусора удаляет только файлы без ссылок."""
+        kept = default_storage.save('posts/aa/kept.jpg', ContentFile(b'1'))
+        Post.objects.filter(pk=PostFormTests.post.pk).update(image=kept)
+        files = [
+            kept,
+            default_storage.save('renditions/posts/aa/kept_400.webp',
+                                 ContentFile(b'2')),
+            default_storage.save('posts/bb/lost.jpg', ContentFile(b'3')),
+            default_storage.save('renditions/posts/bb/lost_400.webp',
+                                 ContentFile(b'4')),
+        ]
+        call_command('collect_media', grace=0, batch=1, stdout=StringIO())
+        self.assertEqual(
+            [default_storage.exists(name) for name in files],
+            [True, True, False, False]
+        )
+
+    def test_collect_media_checks_large_batch(self):
+        """Большая пачка копий проверяется без переполнения SQL."""
+        Post.objects.filter(pk=PostFormTests.post.pk).update(
+            image='posts/aa/kept.jpg'
+        )
+        stems = {f'posts/bb/{number:04}' for number in range(1500)}
+        self.assertEqual(
+            referenced_stems(stems | {'posts/aa/kept'}), {'posts/aa/kept'}
+        )
+
+    def test_collect_media_keeps_no_image(self):
+        """Заглушка для постов без картинки не считается мусором."""
+        name = default_storage.save(NO_IMAGE, ContentFile(b'0'))
+        call_command('collect_media', grace=0, stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
@@ -1,8 +1,15 @@
 # deals/tests/tests_models.py
+from io import StringIO
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Group, Post
+from core.pagination import CursorPaginator
+from posts.models import Comment, Follow, Group, Like, Post, PostView
 
 User = get_user_model()
 
@@ -54,3 +61,82 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+    def test_recount_counters_repairs_totals(self):
+        """Команда recount_counters пересчитывает счётчики поста и автора."""
+        post = PostModelTest.post
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(post=post, author=reader, text='Коммент')
+        Like.objects.create(post=post, user=reader, active=True)
+        Like.objects.create(post=post, user=PostModelTest.user, active=False)
+        PostView.record(post.pk, '127.0.0.1')
+        Follow.objects.create(user=reader, author=PostModelTest.user)
+        call_command('recount_counters', stdout=StringIO())
+        with self.assertNumQueries(1):
+            post = Post.objects.with_counters().get(pk=post.pk)
+            followers = post.author.profile.followers_total
+        self.assertEqual(post.comments_total, 1)
+        self.assertEqual(post.likes_total, 1)
+        self.assertEqual(post.views_total, 1)
+        self.assertEqual(followers, 1)
+
+    def test_post_view_recorded_once_and_aggregated(self):
+        """Просмотр пишется одним запросом и учитывается один раз."""
+        post = PostModelTest.post
+        with self.assertNumQueries(1):
+            PostView.record(post.pk, '10.0.0.1')
+        PostView.record(post.pk, '10.0.0.1')
+        PostView.record(post.pk, '10.0.0.2')
+        self.assertEqual(PostView.objects.aggregate_into_posts(), 2)
+        self.assertEqual(PostView.objects.aggregate_into_posts(), 0)
+        PostView.record(post.pk, '10.0.0.3')
+        self.assertEqual(PostView.objects.aggregate_into_posts(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.views_total, 3)
+        # Пачки забираются по очереди, каждая учитывается один раз
+        for ip in ('10.0.0.4', '10.0.0.5', '10.0.0.6'):
+            PostView.record(post.pk, ip)
+        self.assertEqual(
+            PostView.objects.aggregate_into_posts(batch_size=2), 3
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.views_total, 6)
+
+    def test_like_toggle_keeps_single_row(self):
+        """Повторный лайк снимает отметку, не создавая новых записей."""
+        post = PostModelTest.post
+        user = PostModelTest.user
+        likes_total = post.likes_total
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                Like.objects.toggle(post.pk, user.pk), (True, likes_total + 1)
+            )
+        # UPSERT лайка и UPDATE счётчика; остальное — кэш и savepoint
+        self.assertEqual(
+            len([q for q in queries if 'posts_' in q['sql']]), 2
+        )
+        self.assertEqual(
+            Like.objects.toggle(post.pk, user.pk), (False, likes_total)
+        )
+        self.assertEqual(
+            Like.objects.toggle(post.pk, user.pk), (True, likes_total + 1)
+        )
+        self.assertEqual(Like.objects.filter(post=post, user=user).count(), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса SQLite')
+    def test_cursor_page_uses_feed_index(self):
+        """Страница ленты читается по индексу без сортировки таблицы."""
+        post = PostModelTest.post
+        for queryset in (
+            Post.objects.with_counters(),
+            Post.objects.with_counters().filter(author=post.author),
+            Post.objects.with_counters().filter(group=post.group),
+        ):
+            page = CursorPaginator(queryset, 6)
+            rows = page.queryset.filter(pub_date__lt=post.pub_date)[:7]
+            sql, params = rows.query.sql_with_params()
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(row[-1] for row in db_cursor.fetchall())
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertNotIn('SCAN posts_post', plan)
@@ -1,20 +1,39 @@
 # posts/tests/test_views.py
+import json
+import re
 import shutil
 import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from posts.models import Follow, Group, Post
+from jobs.models import Job
+from posts.likes import liked_post_ids
+from posts.models import Follow, Group, Post, PostView, TimelineEntry
+from posts.tasks import backfill_follower
+from posts.templatetags.post_images import NO_IMAGE
+from users.models import Profile
 from yatube.settings import COUNT_PAGINATOR_PAGE
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    for alias in settings.CACHES
+}
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
@@ -87,11 +106,44 @@ class PostPagesTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='StasBasov')
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.guest_client = Client()
 
+    def collect_feed(self, client, url):
+        """Собирает все посты ленты, проходя страницы по курсору."""
+        posts = []
+        params = {}
+        while True:
+            response = client.get(url, params)
+            posts += response.context['object_list']
+            if not response.context['page_obj'].has_next():
+                return posts
+            params = {'cursor': response.context['page_obj'].next_cursor}
+
+    def test_cursor_pagination_is_stable_on_insert(self):
+        """Новый пост не сдвигает следующую страницу ленты."""
+        first = self.guest_client.get(reverse('posts:main'))
+        cursor = first.context['page_obj'].next_cursor
+        expected = list(
+            self.guest_client.get(
+                reverse('posts:main'), {'cursor': cursor}
+            ).context['object_list']
+        )
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.guest_client.get(
+            reverse('posts:main'), {'cursor': cursor}
+        )
+        self.assertEqual(list(response.context['object_list']), expected)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.guest_client.get(
+            reverse('posts:main'), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.status_code, 404)
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
@@ -135,7 +187,7 @@ class PostPagesTests(TestCase):
     def test_index_correct_post_paginator(self):
         response = self.authorized_client.get(reverse('posts:main'))
         self.assertEqual(
-            response.context['object_list'].count(),
+            len(response.context['object_list']),
             COUNT_PAGINATOR_PAGE
         )
 
@@ -164,7 +216,7 @@ class PostPagesTests(TestCase):
             str(PostPagesTests.user_2)
         )
         self.assertEqual(
-            response.context['object_list'].count(),
+            len(response.context['object_list']),
             COUNT_PAGINATOR_PAGE
         )
 
@@ -359,6 +411,130 @@ class PostPagesTests(TestCase):
             reverse('posts:follow_index')
         )
 
+    def test_counters_updated_by_views(self):
+        """Комментарий, просмотр и подписка обновляют счётчики."""
+        post = PostPagesTests.test_post_for_task_3
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Счётчик комментариев'}
+        )
+        self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': post.author.username}
+            )
+        )
+        PostView.objects.aggregate_into_posts()
+        post.refresh_from_db()
+        post.author.profile.refresh_from_db()
+        self.assertEqual(post.comments_total, 1)
+        self.assertEqual(post.views_total, 1)
+        self.assertEqual(post.author.profile.followers_total, 1)
+
+    def test_post_cards_cached_until_invalidated(self):
+        """Карточка берётся из кэша, пока сигнал не сменит её версию."""
+        post = Post.objects.first()
+        self.guest_client.get(reverse('posts:main'))
+        Post.objects.filter(pk=post.pk).update(text='Без сигнала')
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertNotContains(response, 'Без сигнала')
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Сброс карточки'}
+        )
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertContains(response, 'Без сигнала')
+
+    def test_post_cards_follow_group_and_author_names(self):
+        """Переименование группы и смена имени автора сбрасывают карточку."""
+        group = Group.objects.create(title='Старая группа', slug='old-group')
+        Post.objects.create(text='Свежий', author=self.user, group=group)
+        self.guest_client.get(reverse('posts:main'))
+        group.title = 'Новая группа'
+        group.save()
+        self.user.first_name = 'Стас'
+        self.user.last_name = 'Басов'
+        self.user.save()
+        response = self.guest_client.get(reverse('posts:main'))
+        self.assertContains(response, 'Новая группа')
+        self.assertContains(response, 'Стас Басов')
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_liked_post_ids_cached_per_page(self):
+        """Лайки проверяются только для постов страницы и кэшируются."""
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:3])
+        with self.assertNumQueries(1):
+            self.assertEqual(liked_post_ids(self.user, post_ids), set())
+        with self.assertNumQueries(0):
+            liked_post_ids(self.user, post_ids)
+        self.authorized_client.get(
+            reverse('posts:post_like', kwargs={'post_id': post_ids[0]}),
+            {'data': 'False'}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                liked_post_ids(self.user, post_ids), {post_ids[0]}
+            )
+
+    def test_post_likes_set_state_is_idempotent(self):
+        """Повторная установка лайков пачкой не меняет счётчики."""
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:3])
+        url = reverse('posts:post_likes')
+        for _ in range(2):
+            response = self.authorized_client.post(
+                url, {'posts': post_ids, 'like': True},
+                content_type='application/json'
+            )
+            self.assertEqual(
+                set(response.json()['posts'].values()), {1}
+            )
+        self.assertEqual(response.json()['changed'], [])
+        response = self.authorized_client.post(
+            url, {'posts': post_ids[:1], 'like': False},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['changed'], post_ids[:1])
+        self.assertEqual(
+            response.json()['posts'], {str(post_ids[0]): 0}
+        )
+        response = self.guest_client.post(
+            url, {'posts': post_ids, 'like': True},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 403)
+        for posts in ('123', [str(post_ids[0])], [True], None):
+            response = self.authorized_client.post(
+                url, {'posts': posts, 'like': True},
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_post_like_sets_explicit_state(self):
+        """Повторный запрос виджета не отменяет лайк, мусор в data — 400."""
+        post = Post.objects.first()
+        url = reverse('posts:post_like', kwargs={'post_id': post.pk})
+        for _ in range(2):
+            response = self.authorized_client.get(url, {'data': 'False'})
+            self.assertEqual(
+                response.json(), {'result': False, 'like_cout': 1}
+            )
+        for _ in range(2):
+            response = self.authorized_client.get(url, {'data': 'True'})
+            self.assertEqual(
+                response.json(), {'result': True, 'like_cout': 0}
+            )
+        for data in ('', '(', 'open("x")', '[' * 200):
+            response = self.authorized_client.get(url, {'data': data})
+            self.assertEqual(response.status_code, 400)
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 400)
+
     # Проверяем что не авторизованный клиент не может подписываться
     def test_guest_client_can_not_subscribe(self):
         """
@@ -407,18 +583,13 @@ class PostPagesTests(TestCase):
         )
         # получаем все посты автора на которого подписались из базы
         following_posts = Post.objects.filter(author=PostPagesTests.user_1)
-        # заходим на страницу подписок автора
-        response = self.authorized_client.get(
-            reverse('posts:follow_index')
-        )
-        # костыль для обхода paginator объединяем все посты с 1 и 2 страницы
-        response_post_list = (
-            response.context['paginator'].page(1).object_list
-            | response.context['paginator'].page(2).object_list
+        # проходим все страницы ленты подписок по курсору
+        response_post_list = self.collect_feed(
+            self.authorized_client, reverse('posts:follow_index')
         )
         # проверяем что списки постов из базы и со страницы одинаковые
         self.assertQuerysetEqual(
-            following_posts,
+            following_posts.order_by('-pub_date', '-id'),
             response_post_list,
             transform=lambda x: x)
 
@@ -442,13 +613,197 @@ class PostPagesTests(TestCase):
             author=PostPagesTests.user_1
         )
         # получаем все посты автора user_2
-        response = authorized_client.get(
-            reverse('posts:follow_index')
-        )
-        response_post_list = (
-            response.context['paginator'].page(1).object_list
-            | response.context['paginator'].page(2).object_list
+        response_post_list = self.collect_feed(
+            authorized_client, reverse('posts:follow_index')
         )
         # проверяем что post автора user_1 не отображается
         # в списке не подписанного на него пользователя
         self.assertFalse(new_post_user_1 in response_post_list)
+
+    @override_settings(TIMELINE_SIZE=3)
+    def test_follow_timeline_backfilled_and_trimmed(self):
+        """Лента подписок пополняется при подписке и публикации."""
+        Follow.objects.create(user=self.user, author=PostPagesTests.user_1)
+        timeline = TimelineEntry.objects.filter(user=self.user)
+        latest = Post.objects.filter(author=PostPagesTests.user_1)
+        self.assertCountEqual(
+            timeline.values_list('post', flat=True),
+            latest.values_list('pk', flat=True)[:3]
+        )
+        new_post = Post.objects.create(
+            text='Свежий пост', author=PostPagesTests.user_1
+        )
+        self.assertEqual(timeline.count(), 4)
+        self.assertEqual(TimelineEntry.objects.trim_all(), 1)
+        self.assertEqual(timeline.count(), 3)
+        self.assertTrue(timeline.filter(post=new_post).exists())
+        Follow.objects.filter(user=self.user).delete()
+        self.assertFalse(timeline.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_posts_read_without_fan_out(self):
+        """Посты популярного автора не рассылаются, но видны в ленте."""
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': PostPagesTests.user_2.username}
+            )
+        )
+        post = Post.objects.create(text='Популярный', author=self.user_2)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        feed = self.collect_feed(
+            self.authorized_client, reverse('posts:follow_index')
+        )
+        self.assertEqual(feed[0], post)
+        self.assertEqual(
+            len(feed), Post.objects.filter(author=self.user_2).count()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_posts_backfilled_when_no_longer_popular(self):
+        """Посты автора, ставшего непопулярным, попадают в ленты."""
+        other_client = Client()
+        other_client.force_login(PostPagesTests.user_1)
+        profile_follow = reverse(
+            'posts:profile_follow',
+            kwargs={'username': PostPagesTests.user_2.username}
+        )
+        self.authorized_client.get(profile_follow)
+        other_client.get(profile_follow)
+        post = Post.objects.create(text='Популярный', author=self.user_2)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        other_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': PostPagesTests.user_2.username}
+        ))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        feed = self.collect_feed(
+            self.authorized_client, reverse('posts:follow_index')
+        )
+        self.assertEqual(feed[0], post)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_posts_backfilled_when_follower_deleted(self):
+        """Удаление подписчика каскадом тоже рассылает посты автора."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.user, author=PostPagesTests.user_2)
+        Follow.objects.create(user=reader, author=PostPagesTests.user_2)
+        post = Post.objects.create(text='Популярный', author=self.user_2)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        reader.delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_recount_backfills_authors_with_drifted_counter(self):
+        """Пересчёт счётчиков рассылает посты «популярных» по ошибке."""
+        Follow.objects.create(user=self.user, author=PostPagesTests.user_2)
+        Profile.objects.filter(user=self.user_2).update(followers_total=5)
+        post = Post.objects.create(text='Популярный', author=self.user_2)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        call_command('recount_counters', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    @override_settings(JOBS_EAGER=False)
+    def test_follow_backfill_queued(self):
+        """Лента нового подписчика заполняется фоновой задачей."""
+        Follow.objects.create(user=self.user, author=PostPagesTests.user_1)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            Job.objects.filter(name=backfill_follower.name).count(), 1
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_post_image_renditions_in_srcset(self):
+        """Копии картинки и заглушка строятся при загрузке."""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            text='С картинкой',
+            author=self.user,
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue()),
+        )
+        post.refresh_from_db()
+        card = json.loads(post.renditions)['renditions']['card']
+        self.assertEqual(
+            [variant[:2] for variant in card['jpeg']],
+            [[400, 200], [800, 400]]
+        )
+        self.assertIn('webp', card)
+        rendered = Template(
+            "{% load post_images %}{% picture post 'card' %}"
+        ).render(Context({'post': post}))
+        self.assertIn('type="image/webp"', rendered)
+        self.assertIn('_800.jpeg 800w', rendered)
+        self.assertIn('width="1000" height="500"', rendered)
+        self.assertNotIn('data:image/', rendered)
+        rendered = Template(
+            "{% load post_images %}{% picture post 'card' placeholder=True %}"
+        ).render(Context({'post': post}))
+        self.assertIn('url(data:image/webp;base64,', rendered)
+        # Для старой картинки без копий — исходный файл и задача на копии
+        Post.objects.filter(pk=post.pk).update(renditions='')
+        post.refresh_from_db()
+        with mock.patch(
+            'posts.templatetags.post_images.generate_renditions'
+        ) as generate:
+            rendered = Template(
+                "{% load post_images %}{% picture post 'card' %}"
+            ).render(Context({'post': post}))
+            Template(
+                "{% load post_images %}{% srcset post 'card' %}"
+            ).render(Context({'post': post}))
+        self.assertIn(post.image.url, rendered)
+        generate.delay.assert_called_once_with(post.pk)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cards_reserve_space_for_images(self):
+        """
+        Карточка с копиями картинки задаёт width/height и размытую
+        заглушку; без картинки или копий — исходный файл без них.
+        """
+        images = []
+        for color in ('red', 'blue'):
+            buffer = BytesIO()
+            Image.new('RGB', (1000, 500), color).save(buffer, 'JPEG')
+            images.append(
+                SimpleUploadedFile(f'{color}.jpg', buffer.getvalue())
+            )
+        Post.objects.create(
+            text='С копиями', author=self.user, image=images[0]
+        )
+        Post.objects.create(
+            text='Без картинки', author=self.user
+        )
+        pending = Post.objects.create(
+            text='Копий ещё нет', author=self.user, image=images[1]
+        )
+        Post.objects.filter(pk=pending.pk).update(renditions='')
+        with mock.patch(
+            'posts.templatetags.post_images.generate_renditions'
+        ):
+            response = self.guest_client.get(reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ))
+        # Картинки карточек, от новых постов к старым
+        cards = re.findall(
+            r'<img [^>]*class="img-fluid"[^>]*>', response.content.decode()
+        )
+        self.assertEqual(len(cards), 3)
+        pending_card, no_image_card, rendered_card = cards
+        self.assertIn('width="1000" height="500"', rendered_card)
+        self.assertIn('url(data:image/webp;base64,', rendered_card)
+        self.assertIn('_400.jpeg', rendered_card)
+        pending.refresh_from_db()
+        self.assertIn(f'src="{pending.image.url}"', pending_card)
+        self.assertIn(
+            f'src="{settings.MEDIA_URL}{NO_IMAGE}"', no_image_card
+        )
+        for card in (pending_card, no_image_card):
+            self.assertNotIn('width=', card)
+            self.assertNotIn('data:image/', card)
@@ -0,0 +1,77 @@
+# posts/uploads.py
+"""
+Нормализация картинок постов при загрузке.
+
+Загрузка читается из временного файла (Django сам сбрасывает на диск
+всё больше FILE_UPLOAD_MAX_MEMORY_SIZE), JPEG декодируется сразу
+в уменьшенном масштабе (draft), картинка ужимается до
+POST_IMAGE_MAX_EDGE по длинной стороне и пересохраняется без EXIF.
+Одинаковые картинки дают одинаковый файл, и хранилище
+(core.storage) держит его в одном экземпляре.
+"""
+import io
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+
+def _decode(source, max_edge):
+    try:
+        image = Image.open(source)
+        if image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое изображение: %(width)s×%(height)s.',
+                code='image_pixels',
+                params={'width': image.width, 'height': image.height},
+            )
+        # Для JPEG декодер сразу уменьшает картинку кратно 1/2…1/8
+        image.draft(image.mode, (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать изображение.', code='invalid_image'
+        )
+    return image
+
+
+def normalize_image(upload):
+    """
+    Уменьшенная и пересохранённая копия загруженной картинки:
+    ContentFile с именем image.<jpg|png>.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_size',
+            params={
+                'limit': filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)
+            },
+        )
+    max_edge = settings.POST_IMAGE_MAX_EDGE
+    if hasattr(upload, 'temporary_file_path'):
+        with open(upload.temporary_file_path(), 'rb') as source:
+            image = _decode(source, max_edge)
+    else:
+        upload.seek(0)
+        image = _decode(upload, max_edge)
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        image.save(buffer, 'PNG', optimize=True)
+        extension = 'png'
+    else:
+        image = image.convert('RGB')
+        image.save(
+            buffer, 'JPEG',
+            quality=settings.POST_IMAGE_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        extension = 'jpg'
+    return ContentFile(buffer.getvalue(), name=f'image.{extension}')
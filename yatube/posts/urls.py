@@ -3,8 +3,8 @@ from django.urls import path
 
 from posts.views import (CommentCreate, FavoritViewsView, FollowIndex,
                          GroupPostView, IndexView, PostCreate, PostDelete,
-                         PostDetailView, PostEdit, PostLike, ProfileDetailView,
-                         ProfileFollow, ProfileUnfollow)
+                         PostDetailView, PostEdit, PostLike, PostLikesUpdate,
+                         ProfileDetailView, ProfileFollow, ProfileUnfollow)
 
 app_name = 'posts'
 
@@ -42,5 +42,6 @@ urlpatterns = [
         PostLike.as_view(),
         name='post_like'
     ),
+    path('posts/likes/', PostLikesUpdate.as_view(), name='post_likes'),
     path('favoritviews/', FavoritViewsView.as_view(), name='favorit_views'),
 ]
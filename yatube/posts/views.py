@@ -1,92 +1,74 @@
-import ast
-import datetime
+import json
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
+from django.db import transaction
 from django.http import (
     HttpResponseRedirect,
     HttpResponseForbidden,
     JsonResponse)
-from django.shortcuts import get_list_or_404, get_object_or_404
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.views.generic import ListView
+from django.views.generic import ListView, View
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 
+from core.pagination import CursorPaginationMixin
 from core.views import get_client_ip
+from core.visitors import track_visit
+from posts.cards import prepare_cards
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Ip, Like, Post
+from posts.likes import liked_post_ids
+from posts.models import Follow, Like, Post, PostView
 from yatube.settings import COUNT_PAGINATOR_PAGE
 
 User = get_user_model()
 
 
-class IndexView(ListView):
-    model = Post
+class IndexView(CursorPaginationMixin, ListView):
+    queryset = Post.objects.with_counters()
     template_name = 'posts/index.html'
     paginate_by = COUNT_PAGINATOR_PAGE
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
-
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
-        if self.request.user.is_authenticated:
-            context["posts_like"] = Post.objects.filter(
-                like__user=self.request.user,
-                like__like=True)
+        prepare_cards(context["page_obj"], self.request.user)
         return context
 
 
 class GroupPostView(ListView):
-    model = Post
     template_name = 'posts/group_list.html'
     paginate_by = COUNT_PAGINATOR_PAGE
+    allow_empty = False
 
     def get_queryset(self):
-        return get_list_or_404(Post, group__slug=self.kwargs['slug'])
+        return Post.objects.with_counters().filter(
+            group__slug=self.kwargs['slug']
+        )
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
-        if self.request.user.is_authenticated:
-            context["posts_like"] = Post.objects.filter(
-                like__user=self.request.user,
-                like__like=True)
+        prepare_cards(context["page_obj"], self.request.user)
         return context
 
 
-class ProfileDetailView(ListView):
+class ProfileDetailView(CursorPaginationMixin, ListView):
     model = Post
     paginate_by = COUNT_PAGINATOR_PAGE
     template_name = 'posts/profile.html'
 
     def get_queryset(self):
-        return (
-            Post.objects.select_related('author')
-            .filter(author__username=self.kwargs['username'])
+        return Post.objects.with_counters().filter(
+            author__username=self.kwargs['username']
         )
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
         context["author"] = get_object_or_404(
             User, username=self.kwargs['username']
@@ -97,6 +79,7 @@ class ProfileDetailView(ListView):
                 author__username=self.kwargs['username']).exists()
         ):
             context["following"] = True
+        prepare_cards(context["page_obj"], self.request.user)
         return context
 
 
@@ -107,22 +90,18 @@ class PostDetailView(CreateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
         context["mediaURL"] = settings.MEDIA_URL
-        if self.request.user.is_authenticated:
-            context["posts_like"] = Post.objects.filter(
-                like__user=self.request.user,
-                like__like=True)
-        context["post"] = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        context["comments"] = context["post"].comment.all()
-        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        ip = get_client_ip(self.request)
-        if Ip.objects.filter(ip=ip).exists():
-            post.views.add(Ip.objects.get(ip=ip))
-        else:
-            Ip.objects.create(ip=ip)
-            post.views.add(Ip.objects.get(ip=ip))
+        context["post"] = get_object_or_404(
+            Post.objects.with_counters(), pk=self.kwargs['post_id']
+        )
+        context["comments"] = (
+            context["post"].comment.select_related('author')
+        )
+        context["post"].is_liked = context["post"].pk in liked_post_ids(
+            self.request.user, [context["post"].pk]
+        )
+        track_visit(self.request)
+        PostView.record(context["post"].pk, get_client_ip(self.request))
         return context
 
 
@@ -138,8 +117,6 @@ class PostCreate(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
         context["is_edit"] = False
         return context
 
@@ -160,12 +137,7 @@ class PostEdit(LoginRequiredMixin, UpdateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["is_edit"] = True
         return context
 
@@ -203,48 +175,38 @@ class CommentCreate(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
-        context["post"] = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        context["comments"] = context["post"].comment.all()
+        context["post"] = get_object_or_404(
+            Post.objects.with_counters(), pk=self.kwargs['post_id']
+        )
+        context["comments"] = (
+            context["post"].comment.select_related('author')
+        )
         return context
 
     def form_valid(self, form):
         self.object = form.save(commit=False)
         self.object.author = self.request.user
         self.object.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
-        self.object.save()
+        with transaction.atomic():
+            self.object.save()
+            self.object.post.increment('comments_total')
         return super().form_valid(form)
 
 
-class FollowIndex(LoginRequiredMixin, ListView):
+class FollowIndex(LoginRequiredMixin, CursorPaginationMixin, ListView):
     template_name = 'posts/follow.html'
     paginate_by = COUNT_PAGINATOR_PAGE
 
     def get_queryset(self):
-        posts = Post.objects.filter(
-            author__following__user=self.request.user
-        )
-        return posts
+        return Post.objects.with_counters().timeline(self.request.user)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
-        if self.request.user.is_authenticated:
-            context["posts_like"] = Post.objects.filter(
-                like__user=self.request.user,
-                like__like=True)
+        prepare_cards(context["page_obj"], self.request.user)
         return context
 
 
@@ -255,7 +217,9 @@ class ProfileFollow(LoginRequiredMixin, UpdateView):
             user=request.user, author=author
         ).exists()
         if not follow_create and author != request.user:
-            Follow.objects.create(user=request.user, author=author)
+            # Счётчик подписчиков меняет сигнал в той же транзакции
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
         return HttpResponseRedirect(reverse('posts:follow_index'))
 
 
@@ -272,47 +236,72 @@ class ProfileUnfollow(LoginRequiredMixin, UpdateView):
 
 
 class PostLike(UpdateView):
+    """
+    Лайк из виджета карточки: ?data= — состояние, которое виджет
+    показывает (data-like, True или False). Лайк ставится в обратное
+    состояние явно, поэтому повторный запрос (двойной клик) его
+    не отменяет.
+    """
+    states = {'True': True, 'False': False}
+
     def get(self, request, *args, **kwargs):
         if not self.request.user.is_authenticated:
             return JsonResponse({'result': 404})
-        data = ast.literal_eval(request.GET['data'] or None)
+        data = self.states.get(request.GET.get('data'))
+        if data is None:
+            return JsonResponse({'error': 'Неверный запрос'}, status=400)
         post = get_object_or_404(Post, id=self.kwargs['post_id'])
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        if Like.objects.filter(user=self.request.user, post_like=post).exists():
-            obj_like = Like.objects.get(user=self.request.user, post_like=post)
-            obj_like.like = not obj_like.like
-            obj_like.save()
-        else:
-            obj_like = Like.objects.create(like=not data, user=self.request.user)
-            post.like.add(obj_like)
-
-        return JsonResponse(
-            {'result': data, 'like_cout': post.like_count()}
+        track_visit(self.request)
+        Like.objects.set_state([post.pk], self.request.user.pk, not data)
+        post.refresh_from_db(fields=['likes_total'])
+        return JsonResponse({'result': data, 'like_cout': post.likes_total})
+
+
+class PostLikesUpdate(View):
+    """
+    POST JSON {"posts": [id, ...], "like": true|false}: явно задаёт
+    состояние лайков для пачки постов и возвращает итоговые счётчики.
+    """
+    max_posts = 100
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Требуется вход'}, status=403)
+        try:
+            data = json.loads(request.body)
+            active = data['like']
+            post_ids = data['posts']
+        except (TypeError, ValueError, KeyError):
+            return JsonResponse({'error': 'Неверный запрос'}, status=400)
+        if (not isinstance(active, bool)
+                or not isinstance(post_ids, list)
+                or not 0 < len(post_ids) <= self.max_posts
+                or not all(type(post_id) is int for post_id in post_ids)):
+            return JsonResponse({'error': 'Неверный запрос'}, status=400)
+        changed = Like.objects.set_state(post_ids, request.user.pk, active)
+        counts = Post.objects.filter(pk__in=post_ids).values_list(
+            'pk', 'likes_total'
         )
+        return JsonResponse({
+            'like': active,
+            'changed': sorted(changed),
+            'posts': {post_id: total for post_id, total in counts},
+        })
 
 
 class FavoritViewsView(ListView):
-    model = Post
     template_name = 'posts/view_count_list.html'
     paginate_by = COUNT_PAGINATOR_PAGE
 
     def get_queryset(self):
-        return Post.objects.annotate(total=Count('views')).order_by('-total')
+        return (
+            Post.objects.with_counters()
+            .order_by('-views_total', '-pub_date')
+        )
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        ip = get_client_ip(self.request)
-        if not Ip.objects.filter(ip=ip).exists():
-            Ip.objects.create(ip=ip)
-
-        context["visiterAll"] = Ip.objects.count()
-        context["visiterDay"] = Ip.objects.filter(created__icontains=datetime.date.today()).count()
+        track_visit(self.request)
         context["mediaURL"] = settings.MEDIA_URL
-        if self.request.user.is_authenticated:
-            context["posts_like"] = Post.objects.filter(
-                like__user=self.request.user,
-                like__like=True)
+        prepare_cards(context["page_obj"], self.request.user)
         return context
@@ -0,0 +1,174 @@
+# search/backends.py
+"""
+Поисковые бэкенды над инвертированным индексом search_index.
+
+В индекс попадают уже нормализованные основы слов (search.text),
+поэтому бэкенд только хранит их и ищет по префиксу основы.
+SQLite использует FTS5, PostgreSQL — tsvector с GIN-индексом.
+Бэкенд выбирается по движку БД или явно через SEARCH_BACKEND.
+
+Результаты упорядочены по релевантности, ослабленной с возрастом
+документа: вес делится на 1 + возраст / SEARCH_RECENCY_DAYS.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from search.text import normalize
+
+TABLE = 'search_index'
+
+# Виды индексируемых объектов
+POST = 'post'
+GROUP = 'group'
+AUTHOR = 'author'
+COMMENT = 'comment'
+
+
+class SearchBackend:
+    def index(self, kind, object_id, text, created=None):
+        """Добавляет или заменяет документ в индексе."""
+        raise NotImplementedError
+
+    def match(self, terms):
+        """Условие WHERE и его параметры для основ запроса."""
+        raise NotImplementedError
+
+    def rank(self, terms):
+        """Выражение веса для ORDER BY ... DESC и его параметры."""
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        self.execute(
+            f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s',
+            [kind, object_id]
+        )
+
+    def clear(self, kind):
+        self.execute(f'DELETE FROM {TABLE} WHERE kind = %s', [kind])
+
+    def search(self, query, kind, limit, offset=0):
+        """id объектов вида kind, подходящих под запрос, по убыванию веса."""
+        terms = normalize(query)
+        if not terms:
+            return []
+        where, params = self.match(terms)
+        rank, rank_params = self.rank(terms)
+        rows = self.execute(
+            f'SELECT object_id FROM {TABLE} WHERE {where} AND kind = %s '
+            f'ORDER BY {rank} DESC, object_id DESC LIMIT %s OFFSET %s',
+            [*params, kind, *rank_params, limit, offset]
+        )
+        return [object_id for object_id, in rows]
+
+    def search_sections(self, query, kinds, limit):
+        """
+        Лучшие limit id каждого вида из kinds одним запросом:
+        совпадения нумеруются по весу отдельно внутри каждого вида.
+        """
+        sections = {kind: [] for kind in kinds}
+        terms = normalize(query)
+        if not terms or not kinds:
+            return sections
+        where, params = self.match(terms)
+        rank, rank_params = self.rank(terms)
+        placeholders = ', '.join(['%s'] * len(kinds))
+        rows = self.execute(
+            'SELECT kind, object_id FROM ('
+            'SELECT kind, object_id, ROW_NUMBER() OVER ('
+            'PARTITION BY kind ORDER BY score DESC, object_id DESC'
+            ') AS position FROM ('
+            f'SELECT kind, object_id, {rank} AS score FROM {TABLE} '
+            f'WHERE {where} AND kind IN ({placeholders})'
+            ') matches) numbered WHERE position <= %s '
+            'ORDER BY kind, position',
+            [*rank_params, *params, *kinds, limit]
+        )
+        for kind, object_id in rows:
+            sections[kind].append(object_id)
+        return sections
+
+    def count(self, query, kind, cap):
+        """Число совпадений, но не больше cap + 1: полный COUNT не нужен."""
+        terms = normalize(query)
+        if not terms:
+            return 0
+        where, params = self.match(terms)
+        rows = self.execute(
+            'SELECT COUNT(*) FROM ('
+            f'SELECT 1 FROM {TABLE} WHERE {where} AND kind = %s LIMIT %s'
+            ') matches',
+            [*params, kind, cap + 1]
+        )
+        return rows[0][0]
+
+    def execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+        return []
+
+
+class SQLiteBackend(SearchBackend):
+    def index(self, kind, object_id, text, created=None):
+        self.remove(kind, object_id)
+        self.execute(
+            f'INSERT INTO {TABLE} (body, kind, object_id, created) '
+            'VALUES (%s, %s, %s, %s)',
+            [' '.join(normalize(text)), kind, object_id,
+             int(created.timestamp()) if created else None]
+        )
+
+    def match(self, terms):
+        return f'{TABLE} MATCH %s', [
+            ' '.join(f'"{term}"*' for term in terms)
+        ]
+
+    def rank(self, terms):
+        # bm25() отрицателен: чем меньше, тем релевантнее
+        return (
+            f"-bm25({TABLE}) / (1 + (strftime('%%s', 'now') "
+            "- coalesce(created, strftime('%%s', 'now'))) / 86400.0 / %s)"
+        ), [settings.SEARCH_RECENCY_DAYS]
+
+
+class PostgresBackend(SearchBackend):
+    def index(self, kind, object_id, text, created=None):
+        self.execute(
+            f'INSERT INTO {TABLE} (kind, object_id, body, created) '
+            "VALUES (%s, %s, to_tsvector('simple', %s), %s) "
+            'ON CONFLICT (kind, object_id) DO UPDATE '
+            'SET body = excluded.body, created = excluded.created',
+            [kind, object_id, ' '.join(normalize(text)), created]
+        )
+
+    def match(self, terms):
+        return "body @@ to_tsquery('simple', %s)", [
+            ' & '.join(f'{term}:*' for term in terms)
+        ]
+
+    def rank(self, terms):
+        return (
+            "ts_rank(body, to_tsquery('simple', %s)) / (1 + extract(epoch "
+            'FROM now() - coalesce(created, now())) / 86400 / %s)'
+        ), [*self.match(terms)[1], settings.SEARCH_RECENCY_DAYS]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    try:
+        return BACKENDS[connection.vendor]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Нет поискового бэкенда для БД {connection.vendor}'
+        )
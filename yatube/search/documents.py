@@ -0,0 +1,38 @@
+# search/documents.py
+"""Какие объекты попадают в поисковый индекс и с каким текстом."""
+from django.contrib.auth import get_user_model
+
+from posts.models import Comment, Group, Post
+from search.backends import AUTHOR, COMMENT, GROUP, POST, get_backend
+
+User = get_user_model()
+
+
+def post_document(post):
+    return post.text, post.pub_date
+
+
+def group_document(group):
+    return f'{group.title} {group.description}', None
+
+
+def author_document(user):
+    return f'{user.username} {user.first_name} {user.last_name}', None
+
+
+def comment_document(comment):
+    return comment.text, comment.created
+
+
+# Вид документа: модель и функция, возвращающая (текст, дата создания)
+SOURCES = {
+    POST: (Post, post_document),
+    GROUP: (Group, group_document),
+    AUTHOR: (User, author_document),
+    COMMENT: (Comment, comment_document),
+}
+
+
+def index_object(kind, instance, backend=None):
+    text, created = SOURCES[kind][1](instance)
+    (backend or get_backend()).index(kind, instance.pk, text, created)
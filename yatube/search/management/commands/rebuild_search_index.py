@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search.backends import get_backend
+from search.documents import SOURCES, index_object
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов, групп, авторов '
+        'и комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=sorted(SOURCES), action='append',
+            help='Перестроить только документы этого вида.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько объектов читать из БД за раз.'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        for kind in options['kind'] or SOURCES:
+            model, _ = SOURCES[kind]
+            objects = model._default_manager.order_by('pk')
+            indexed = 0
+            with transaction.atomic():
+                backend.clear(kind)
+                rows = objects.iterator(chunk_size=options['chunk_size'])
+                for instance in rows:
+                    index_object(kind, instance, backend)
+                    indexed += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Проиндексировано ({kind}): {indexed}'
+            ))
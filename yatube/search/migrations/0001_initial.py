@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:40
+
+from django.db import migrations
+
+SQLITE = (
+    'CREATE VIRTUAL TABLE search_index USING fts5('
+    "body, kind UNINDEXED, object_id UNINDEXED, tokenize = 'unicode61')",
+    'DROP TABLE search_index',
+)
+
+POSTGRESQL = (
+    'CREATE TABLE search_index ('
+    'id serial PRIMARY KEY, kind varchar(20) NOT NULL, '
+    'object_id integer NOT NULL, body tsvector NOT NULL, '
+    'UNIQUE (kind, object_id)); '
+    'CREATE INDEX search_index_body ON search_index USING gin (body)',
+    'DROP TABLE search_index',
+)
+
+
+def create_index(apps, schema_editor):
+    sql = {'sqlite': SQLITE, 'postgresql': POSTGRESQL}.get(
+        schema_editor.connection.vendor
+    )
+    if sql:
+        schema_editor.execute(sql[0])
+
+
+def drop_index(apps, schema_editor):
+    sql = {'sqlite': SQLITE, 'postgresql': POSTGRESQL}.get(
+        schema_editor.connection.vendor
+    )
+    if sql:
+        schema_editor.execute(sql[1])
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0025_like_post'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:10
+
+from django.db import migrations
+
+SQLITE = [
+    'CREATE VIRTUAL TABLE search_index_new USING fts5('
+    'body, kind UNINDEXED, object_id UNINDEXED, created UNINDEXED, '
+    "tokenize = 'unicode61')",
+    'INSERT INTO search_index_new (body, kind, object_id) '
+    'SELECT body, kind, object_id FROM search_index',
+    'DROP TABLE search_index',
+    'ALTER TABLE search_index_new RENAME TO search_index',
+    "UPDATE search_index SET created = (SELECT strftime('%s', pub_date) "
+    "FROM posts_post WHERE posts_post.id = object_id) WHERE kind = 'post'",
+]
+
+POSTGRESQL = [
+    'ALTER TABLE search_index ADD COLUMN created timestamp with time zone',
+    'UPDATE search_index SET created = posts_post.pub_date '
+    'FROM posts_post '
+    "WHERE posts_post.id = object_id AND kind = 'post'",
+]
+
+
+def add_created(apps, schema_editor):
+    sql = {'sqlite': SQLITE, 'postgresql': POSTGRESQL}.get(
+        schema_editor.connection.vendor, []
+    )
+    for statement in sql:
+        schema_editor.execute(statement, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_created, migrations.RunPython.noop),
+    ]
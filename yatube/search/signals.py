@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+
+from search.documents import SOURCES
+from search.tasks import index_document, remove_document
+
+
+def object_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя меняет только last_login
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    index_document.delay(KINDS[sender], instance.pk)
+
+
+def object_deleted(sender, instance, **kwargs):
+    remove_document.delay(KINDS[sender], instance.pk)
+
+
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+for model in KINDS:
+    post_save.connect(object_saved, sender=model)
+    post_delete.connect(object_deleted, sender=model)
@@ -0,0 +1,21 @@
+from jobs.tasks import task
+from search.backends import get_backend
+from search.documents import SOURCES, index_object
+# Перестройка подсказок объявлена рядом с их логикой
+from search.typeahead import rebuild_index  # noqa: F401
+
+
+@task
+def index_document(kind, object_id):
+    """Обновляет документ в индексе; удалённый объект убирается."""
+    model, _ = SOURCES[kind]
+    instance = model._default_manager.filter(pk=object_id).first()
+    if instance is None:
+        get_backend().remove(kind, object_id)
+    else:
+        index_object(kind, instance)
+
+
+@task
+def remove_document(kind, object_id):
+    get_backend().remove(kind, object_id)
@@ -0,0 +1,181 @@
+# search/tests.py
+import datetime
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import SEARCH
+from jobs.models import Job
+from posts.models import Comment, Group, Post
+from search.backends import AUTHOR, COMMENT, GROUP, POST, get_backend
+from search.text import normalize
+from search.typeahead import INDEX_KEY, rebuild_index, reset_index, suggest
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки спали на крыше'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собака увидела кошку'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_normalize_stems_russian_words(self):
+        """Разные формы слова сводятся к одной основе."""
+        self.assertEqual(normalize('Кошки КОШКУ кошкой'), ['кошк'] * 3)
+        self.assertEqual(normalize('Ёлка ёлки'), ['елк', 'елк'])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при сохранении и удалении поста."""
+        backend = get_backend()
+        self.assertCountEqual(
+            backend.search('кошка', POST, 10), [self.cats.pk, self.dogs.pk]
+        )
+        dogs = Post.objects.get(pk=self.dogs.pk)
+        dogs.text = 'Собака спит'
+        dogs.save()
+        self.assertEqual(backend.search('кошка', POST, 10), [self.cats.pk])
+        Post.objects.get(pk=self.cats.pk).delete()
+        self.assertEqual(backend.search('кошка', POST, 10), [])
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index заново заполняет индекс."""
+        backend = get_backend()
+        backend.clear(POST)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(backend.search('крыш', POST, 10), [self.cats.pk])
+
+    def test_search_view_finds_word_forms(self):
+        response = self.guest_client.get(
+            reverse('search:search'), {'data': 'СПАЛА'}
+        )
+        self.assertIn(self.cats.text, response.json()['result'])
+        self.assertNotIn(self.dogs.text, response.json()['result'])
+
+    def test_search_prefers_recent_posts(self):
+        """При равной релевантности свежие посты выше старых."""
+        old = Post.objects.create(author=self.user, text='Кошка на крыше')
+        old.pub_date = timezone.now() - datetime.timedelta(days=365)
+        old.save()
+        new = Post.objects.create(author=self.user, text='Кошка на крыше')
+        ranked = get_backend().search('кошка крыша', POST, 10)
+        self.assertEqual(ranked[0], new.pk)
+        self.assertLess(ranked.index(self.cats.pk), ranked.index(old.pk))
+
+    @override_settings(SEARCH_PAGE_SIZE=2, SEARCH_COUNT_CAP=3)
+    def test_search_view_pages_with_capped_total(self):
+        """Выдача ограничена страницей, счётчик — пределом подсчёта."""
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Кошка {number}')
+        url = reverse('search:search')
+        first = self.guest_client.get(url, {'data': 'кошка'}).json()
+        self.assertEqual(first['total'], '3+')
+        self.assertEqual(first['next'], 2)
+        self.assertEqual(first['result'].count('search-link-post'), 2)
+        second = self.guest_client.get(
+            url, {'data': 'кошка', 'cursor': first['next']}
+        ).json()
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['result'].count('search-link-post'), 2)
+
+    def test_federated_search_returns_typed_sections(self):
+        """Группы, авторы и комментарии находятся одним запросом к индексу."""
+        group = Group.objects.create(
+            title='Котоводы', slug='cats', description='Всё о кошках'
+        )
+        author = User.objects.create_user(
+            username='murzik', first_name='Кошка', last_name='Мурка'
+        )
+        comment = Comment.objects.create(
+            post=self.dogs, author=author, text='Моя кошка тоже'
+        )
+        with self.assertNumQueries(1):
+            sections = get_backend().search_sections(
+                'кошка', [POST, GROUP, AUTHOR, COMMENT], 1
+            )
+        self.assertEqual(len(sections[POST]), 1)
+        self.assertEqual(sections[GROUP], [group.pk])
+        self.assertEqual(sections[AUTHOR], [author.pk])
+        self.assertEqual(sections[COMMENT], [comment.pk])
+        result = self.guest_client.get(
+            reverse('search:search'), {'data': 'кошка'}
+        ).json()['result']
+        self.assertIn(reverse('posts:group_list', args=['cats']), result)
+        self.assertIn(reverse('posts:profile', args=['murzik']), result)
+        self.assertIn('Моя кошка тоже', result)
+
+
+@override_settings(
+    CACHES={
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        for alias in settings.CACHES
+    },
+    SEARCH_TYPEAHEAD_MIN_LENGTH=3
+)
+class TypeaheadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='koshkin', first_name='Иван', last_name='Кошкин'
+        )
+        Post.objects.create(author=cls.user, text='Кошка спит. Кошка ест.')
+        Post.objects.create(author=cls.user, text='Кошки и котята')
+
+    def setUp(self):
+        reset_index()
+        caches[SEARCH].clear()
+        self.guest_client = Client()
+
+    def test_short_query_rejected(self):
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                reverse('search:typeahead'), {'q': ' Ко '}
+            )
+        self.assertEqual(response.json()['suggestions'], [])
+
+    def test_prefix_suggestions_cached(self):
+        """Слова и авторы по префиксу, повторный запрос — из кэша."""
+        url = reverse('search:typeahead')
+        response = self.guest_client.get(url, {'q': 'КОШ'})
+        self.assertEqual(response.json()['suggestions'], [
+            {'kind': 'author', 'text': 'koshkin',
+             'url': reverse('posts:profile', args=['koshkin'])},
+            {'kind': 'word', 'text': 'кошка'},
+            {'kind': 'word', 'text': 'кошки'},
+        ])
+        Post.objects.create(author=self.user, text='Кошмар')
+        with self.assertNumQueries(0):
+            cached = self.guest_client.get(url, {'q': 'кош '})
+        self.assertEqual(cached.json(), response.json())
+        self.assertIn('max-age', response['Cache-Control'])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_stale_index_served_while_rebuilt(self):
+        """Устаревший индекс отдаётся, перестройка ставится один раз."""
+        caches[SEARCH].set(INDEX_KEY, {
+            'built': time.time() - 3600,
+            'entries': [('кошмар', 'word', 'кошмар', 1)],
+        }, None)
+        for _ in range(3):
+            reset_index()
+            self.assertEqual(
+                suggest('кош', 8), [{'kind': 'word', 'text': 'кошмар'}]
+            )
+        self.assertEqual(
+            Job.objects.filter(name=rebuild_index.name).count(), 1
+        )
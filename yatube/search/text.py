@@ -0,0 +1,102 @@
+# search/text.py
+"""
+Нормализация текста для поискового индекса: нижний регистр, «ё» → «е»
+и стемминг русских слов по алгоритму Портера (Snowball).
+"""
+import re
+
+WORD_RE = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+
+
+def _suffixes(plain, after_a=''):
+    """Окончания от длинных к коротким; after_a — только после «а»/«я»."""
+    items = [(suffix, False) for suffix in plain.split()]
+    items += [(suffix, True) for suffix in after_a.split()]
+    return sorted(items, key=lambda item: -len(item[0]))
+
+
+PERFECTIVE_GERUND = _suffixes('ив ивши ившись ыв ывши ывшись', 'в вши вшись')
+REFLEXIVE = _suffixes('ся сь')
+ADJECTIVE = _suffixes(
+    'ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому '
+    'их ых ую юю ая яя ою ею'
+)
+PARTICIPLE = _suffixes('ивш ывш ующ', 'ем нн вш ющ щ')
+VERB = _suffixes(
+    'ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено '
+    'ят ует уют ит ыт ены ить ыть ишь ую ю',
+    'ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно'
+)
+NOUN = _suffixes(
+    'а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием ем '
+    'ам ом о у ах иях ях ы ь ию ью ю ия ья я'
+)
+SUPERLATIVE = _suffixes('ейш ейше')
+DERIVATIONAL = _suffixes('ост ость')
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, char in enumerate(word):
+        if char in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def _cut(word, start, suffixes):
+    """Отрезает самое длинное подходящее окончание или возвращает None."""
+    for suffix, after_a in suffixes:
+        cut = len(word) - len(suffix)
+        if cut < start or not word.endswith(suffix):
+            continue
+        if after_a and not (cut > start and word[cut - 1] in 'ая'):
+            continue
+        return word[:cut]
+    return None
+
+
+def stem(word):
+    rv, r2 = _regions(word)
+    result = _cut(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _cut(word, rv, REFLEXIVE) or word
+        result = _cut(word, rv, ADJECTIVE)
+        if result is not None:
+            result = _cut(result, rv, PARTICIPLE) or result
+        else:
+            result = _cut(word, rv, VERB)
+            if result is None:
+                result = _cut(word, rv, NOUN)
+    if result is not None:
+        word = result
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+    word = _cut(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    result = _cut(word, rv, SUPERLATIVE)
+    if result is not None:
+        return result[:-1] if result.endswith('нн') else result
+    if word.endswith('ь') and len(word) > rv:
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def normalize(text):
+    """Список основ слов текста в порядке появления."""
+    return [stem(token) for token in tokenize(text)]
@@ -0,0 +1,135 @@
+# search/typeahead.py
+"""
+Подсказки при наборе запроса.
+
+Префиксный индекс — отсортированный список слов из постов и имён
+авторов с их весом. Он хранится в общем кэше и копией в памяти
+процесса, а поиск префикса в нём — двоичный поиск без обращений к БД.
+Индекс старше SEARCH_TYPEAHEAD_INDEX_TTL секунд перестраивается
+фоновой задачей; пока она не выполнена, отдаётся прежний индекс.
+"""
+import bisect
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Count
+from django.urls import reverse
+
+from core.cache import SEARCH
+from jobs.tasks import task
+from posts.models import Post
+from search.text import tokenize
+
+User = get_user_model()
+
+INDEX_KEY = 'typeahead:index'
+# Ключ-замок: перестройку ставит в очередь только один запрос
+REBUILD_KEY = 'typeahead:rebuild'
+
+# Виды подсказок
+WORD = 'word'
+AUTHOR = 'author'
+
+_lock = threading.Lock()
+_local = {'expires': 0, 'terms': [], 'entries': []}
+
+
+def normalize_prefix(query):
+    """Приводит запрос к ключу префикса: «Кош », «кош» и «КОШ» — одно."""
+    return ' '.join(tokenize(query))
+
+
+def build_index():
+    """Строит список (термин, вид, подпись, вес), упорядоченный по термину."""
+    words = Counter()
+    texts = Post.objects.values_list('text', flat=True)
+    for text in texts.iterator(chunk_size=500):
+        words.update(
+            word for word in set(tokenize(text))
+            if len(word) >= settings.SEARCH_TYPEAHEAD_MIN_LENGTH
+            and not word.isdigit()
+        )
+    top_words = words.most_common(settings.SEARCH_TYPEAHEAD_TERMS)
+    entries = [(word, WORD, word, weight) for word, weight in top_words]
+    authors = User.objects.annotate(weight=Count('posts')).filter(
+        weight__gt=0
+    ).values_list('username', 'first_name', 'last_name', 'weight')
+    for username, first_name, last_name, weight in authors:
+        names = {username, first_name, last_name, f'{first_name} {last_name}'}
+        entries += [
+            (term, AUTHOR, username, weight)
+            for term in {normalize_prefix(name) for name in names} if term
+        ]
+    return sorted(entries)
+
+
+@task
+def rebuild_index():
+    """Строит индекс и сохраняет его в общий кэш."""
+    caches[SEARCH].set(
+        INDEX_KEY, {'built': time.time(), 'entries': build_index()}, None
+    )
+    caches[SEARCH].delete(REBUILD_KEY)
+
+
+def request_rebuild():
+    """Ставит перестройку индекса в очередь, если её ещё не поставили."""
+    # Замок истекает сам, если задача не выполнилась
+    if caches[SEARCH].add(
+        REBUILD_KEY, True, settings.SEARCH_TYPEAHEAD_INDEX_TTL
+    ):
+        rebuild_index.delay()
+
+
+def get_index():
+    """
+    Индекс из памяти процесса или общего кэша. Устаревший индекс
+    отдаётся, пока фоновая задача строит новый; до первой сборки
+    индекс пуст.
+    """
+    if _local['expires'] > time.monotonic():
+        return _local['terms'], _local['entries']
+    with _lock:
+        if _local['expires'] <= time.monotonic():
+            ttl = settings.SEARCH_TYPEAHEAD_INDEX_TTL
+            stored = caches[SEARCH].get(INDEX_KEY)
+            if stored is None or stored['built'] + ttl <= time.time():
+                request_rebuild()
+                stored = caches[SEARCH].get(INDEX_KEY, stored)
+            if stored is None:
+                return [], []
+            age = max(time.time() - stored['built'], 0)
+            _local.update(
+                expires=time.monotonic() + max(ttl - age, 1),
+                terms=[entry[0] for entry in stored['entries']],
+                entries=stored['entries'],
+            )
+    return _local['terms'], _local['entries']
+
+
+def reset_index():
+    """Сбрасывает копию индекса в памяти процесса."""
+    _local['expires'] = 0
+
+
+def suggest(prefix, limit):
+    """До limit подсказок по префиксу, самые частые первыми."""
+    terms, entries = get_index()
+    matches = {}
+    for index in range(bisect.bisect_left(terms, prefix), len(terms)):
+        if not terms[index].startswith(prefix):
+            break
+        _, kind, label, weight = entries[index]
+        matches[kind, label] = max(weight, matches.get((kind, label), 0))
+    ranked = sorted(matches, key=lambda match: (-matches[match], match))
+    suggestions = []
+    for kind, label in ranked[:limit]:
+        suggestion = {'kind': kind, 'text': label}
+        if kind == AUTHOR:
+            suggestion['url'] = reverse('posts:profile', args=[label])
+        suggestions.append(suggestion)
+    return suggestions
@@ -7,4 +7,5 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.search, name='search'),
+    path('typeahead/', views.typeahead, name='typeahead'),
 ]
@@ -1,27 +1,104 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
 from django.http import JsonResponse
 from django.template.loader import render_to_string
-from django.db.models import Q
+from django.utils.cache import patch_cache_control
 
+from core.cache import SEARCH
 from posts.models import Post
+from search.backends import AUTHOR, COMMENT, GROUP, POST, get_backend
+from search.documents import SOURCES
+from search.typeahead import normalize_prefix, suggest
 
 
-def search(request):
-    # This realis AJAX jqury
-    # if request.is_ajax() and request.GET['data']:
-    #     content = {'search_list': Post.objects.filter(
-    #         text__icontains=request.GET['data']),}
-    # result = render_to_string('includes/search.html', context=content)
+def get_offset(request):
+    """Смещение из курсора ?cursor=; дальше предела подсчёта не листаем."""
+    try:
+        offset = int(request.GET.get('cursor') or 0)
+    except ValueError:
+        offset = 0
+    return min(max(offset, 0), settings.SEARCH_COUNT_CAP)
+
+
+def load_sections(sections):
+    """Объекты найденных групп, авторов и комментариев в порядке веса."""
+    loaded = {}
+    for kind, ids in sections.items():
+        model = SOURCES[kind][0]
+        objects = model._default_manager.in_bulk(ids)
+        loaded[kind] = [objects[pk] for pk in ids if pk in objects]
+    return loaded
 
+
+def search(request):
     content = {'search_list': ''}
-    data_search = request.GET['data'] or None
+    data_search = request.GET.get('data')
+    next_cursor = total = None
 
     if data_search:
-        content = {'search_list': Post.objects.filter(
-            Q(text__icontains=data_search) |
-            Q(text__icontains=data_search.lower()) |
-            Q(text__icontains=data_search.upper()) |
-            Q(text__icontains=data_search.title()))}
-        # content = {'search_list': Post.objects.filter(
-        #     text__icontains=data_search.lower())}
+        backend = get_backend()
+        page_size = settings.SEARCH_PAGE_SIZE
+        offset = get_offset(request)
+        sections = {}
+        if offset == 0:
+            # Первая страница: все виды документов одним запросом
+            sections = backend.search_sections(
+                data_search, list(SOURCES), page_size + 1
+            )
+            post_ids = sections.pop(POST)
+            sections = {
+                kind: ids[:settings.SEARCH_SECTION_SIZE]
+                for kind, ids in sections.items()
+            }
+        else:
+            post_ids = backend.search(
+                data_search, POST, page_size + 1, offset
+            )
+        if (len(post_ids) > page_size
+                and offset + page_size < settings.SEARCH_COUNT_CAP):
+            next_cursor = offset + page_size
+        post_ids = post_ids[:page_size]
+        if offset == 0 and next_cursor is None:
+            total = len(post_ids)
+        else:
+            total = backend.count(
+                data_search, POST, settings.SEARCH_COUNT_CAP
+            )
+        if total > settings.SEARCH_COUNT_CAP:
+            total = f'{settings.SEARCH_COUNT_CAP}+'
+        posts = Post.objects.in_bulk(post_ids)
+        sections = load_sections(sections)
+        content = {
+            'search_list': [posts[pk] for pk in post_ids if pk in posts],
+            'groups': sections.get(GROUP),
+            'authors': sections.get(AUTHOR),
+            'comments': sections.get(COMMENT),
+            'total': total,
+            'offset': offset,
+            'query': data_search,
+            'next_cursor': next_cursor,
+        }
     result = render_to_string('includes/search.html', context=content)
-    return JsonResponse({'result': result})
+    return JsonResponse(
+        {'result': result, 'total': total, 'next': next_cursor}
+    )
+
+
+def typeahead(request):
+    """
+    JSON-подсказки по префиксу ?q=. Короткие запросы отклоняются
+    без обращения к индексу, ответы на частые префиксы кэшируются.
+    """
+    prefix = normalize_prefix(request.GET.get('q', ''))
+    if len(prefix) < settings.SEARCH_TYPEAHEAD_MIN_LENGTH:
+        return JsonResponse({'query': prefix, 'suggestions': []})
+    key = 'typeahead:' + hashlib.md5(prefix.encode()).hexdigest()
+    suggestions = caches[SEARCH].get(key)
+    if suggestions is None:
+        suggestions = suggest(prefix, settings.SEARCH_TYPEAHEAD_LIMIT)
+        caches[SEARCH].set(key, suggestions, settings.SEARCH_TYPEAHEAD_TTL)
+    response = JsonResponse({'query': prefix, 'suggestions': suggestions})
+    patch_cache_control(response, max_age=settings.SEARCH_TYPEAHEAD_TTL)
+    return response
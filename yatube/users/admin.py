@@ -1 +1,16 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import Profile
+
+
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'followers_total',
+    )
+    search_fields = ('user__username',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Profile, ProfileAdmin)
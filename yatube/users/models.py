@@ -1 +1,49 @@
-# Create your models here.
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import F, OuterRef
+
+from posts.models import Follow, count_subquery
+
+User = get_user_model()
+
+
+class ProfileQuerySet(models.QuerySet):
+    def recount_totals(self):
+        """Пересчитывает число подписчиков одним UPDATE."""
+        return self.update(
+            followers_total=count_subquery(
+                Follow.objects.filter(author=OuterRef('user')), 'author'
+            )
+        )
+
+
+class Profile(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    followers_total = models.PositiveIntegerField(
+        'Подписчики',
+        default=0
+    )
+
+    objects = ProfileQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return self.user.username
+
+    @classmethod
+    def increment_followers(cls, user, delta=1):
+        """Атомарно изменяет счётчик подписчиков автора (не ниже нуля)."""
+        profiles = cls.objects.filter(user=user)
+        if delta < 0:
+            profiles = profiles.filter(followers_total__gte=-delta)
+        profiles.update(
+            followers_total=F('followers_total') + delta
+        )
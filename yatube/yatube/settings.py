@@ -44,10 +44,12 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'search.apps.SearchConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,6 +75,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.visitors.visitors',
                 'social_django.context_processors.backends',
                 'social_django.context_processors.login_redirect',
             ],
@@ -131,17 +134,24 @@ USE_TZ = False
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-if not DEBUG:
-    STATIC_ROOT = ''
-else:
-    STATIC_ROOT = '/home/dedau/yatube/static'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# collectstatic добавляет хеш к именам файлов и пишет сжатые копии
+# .gz/.br; core.middleware.StaticFilesMiddleware раздаёт их
+# с долгим кешем. Файлы без хеша кешируются на STATIC_MAX_AGE (сек.)
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/'
 
-#  подключаем движок EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+#  подключаем движок EmailBackend; для локальной проверки писем
+# EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+# (письма в EMAIL_FILE_PATH) или ...console.EmailBackend
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend'
+)
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # настройки для сервера реальной отправки
 # DOMAIN_NAME = 'http://dedau.pythonanywhere.com '
@@ -152,6 +162,15 @@ EMAIL_HOST_USER = SOCIAL['EMAIL_HOST_USER']
 EMAIL_HOST_PASSWORD = SOCIAL['EMAIL_HOST_PASSWORD']
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+EMAIL_TIMEOUT = 10
+
+# Очередь исходящих писем: писем за одно соединение, время (сек.),
+# на которое письмо скрыто от других отправителей, число попыток
+# и начальная задержка повтора (сек., удваивается с каждой попыткой)
+MAIL_OUTBOX_BATCH = 50
+MAIL_OUTBOX_SEND_TIMEOUT = 300
+MAIL_OUTBOX_MAX_ATTEMPTS = 6
+MAIL_OUTBOX_RETRY_DELAY = 60
 
 
 # Число страниц при пагинации
@@ -160,17 +179,132 @@ COUNT_PAGINATOR_PAGE = 6
 # Имя view-функции, обрабатывающей ошибку 403
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Уменьшенные копии картинок постов: ширины (px) для карточки
+# (обычный и retina-экран) и всплывающего окна, форматы копий
+# (JPEG строится всегда как запасной)
+POST_IMAGE_RENDITIONS = {
+    'card': (400, 800),
+    'popup': (1280,),
+}
+POST_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+# Длинная сторона размытой заглушки, встроенной в HTML карточки (px)
+POST_IMAGE_PLACEHOLDER_SIZE = 16
+
+# Ограничения загружаемых картинок: размер файла (байт), число
+# пикселей до декодирования, длинная сторона после уменьшения (px)
+# и качество пересохранённого JPEG
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_EDGE = 2048
+POST_IMAGE_QUALITY = 85
+
+# Сборка мусора в media: сколько секунд файл без ссылок ещё хранится
+# и сколько файлов проверяется одним запросом
+MEDIA_GC_GRACE = 60 * 60
+MEDIA_GC_BATCH = 500
+
 # Путь к фалай media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/home/dedau/yatube/media'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-# Подключаем кэш
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# Отложенная запись посетителей: период сброса буфера (сек.)
+# и максимальное число ip в буфере процесса
+VISITORS_FLUSH_INTERVAL = 5
+VISITORS_BUFFER_SIZE = 1000
+# Счётчик уникальных посетителей: 'exact' — таблица Ip,
+# 'hll' — приближённые скетчи HyperLogLog без хранения ip
+VISITORS_COUNTER = 'exact'
+# Время жизни кэша статистики посетителей (сек.)
+VISITORS_STATS_TTL = 60
+
+# Подключаем кэш: общий для всех процессов Redis, если задан REDIS_URL
+# (нужен пакет django-redis), иначе таблицы кэша в базе SQLite
+# (создаются командой createcachetable)
+REDIS_URL = os.getenv('REDIS_URL')
+# Версия ключей кэша: увеличение сбрасывает все закэшированные данные
+CACHE_VERSION = int(os.getenv('CACHE_VERSION', 1))
+# Отдельные пространства ключей: лента, счётчики, поиск. В БД у каждого
+# своя таблица и свой предел числа ключей; при переполнении удаляется
+# 1/CACHE_CULL_FREQUENCY ключей таблицы. У Redis пределы задаются
+# его maxmemory и maxmemory-policy (например, allkeys-lru)
+CACHE_MAX_ENTRIES = {
+    'default': 1000,
+    'feed': 20000,
+    'counters': 50000,
+    'search': 5000,
 }
+CACHE_CULL_FREQUENCY = 4
+# Проверка кэшей /health/cache/ доступна staff-пользователям и запросам
+# с этим токеном в заголовке X-Health-Token (пустой — только staff)
+HEALTH_CHECK_TOKEN = os.getenv('HEALTH_CHECK_TOKEN', '')
+if REDIS_URL:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient'
+            },
+            'KEY_PREFIX': alias,
+            'VERSION': CACHE_VERSION,
+        }
+        for alias in CACHE_MAX_ENTRIES
+    }
+else:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': f'yatube_cache_{alias}',
+            'OPTIONS': {
+                'MAX_ENTRIES': max_entries,
+                'CULL_FREQUENCY': CACHE_CULL_FREQUENCY,
+            },
+            'KEY_PREFIX': alias,
+            'VERSION': CACHE_VERSION,
+        }
+        for alias, max_entries in CACHE_MAX_ENTRIES.items()
+    }
+
+# Фоновые задачи (приложение jobs, команда run_jobs): число потоков
+# обработчика, пауза опроса пустой очереди (сек.), время (сек.),
+# на которое задача скрыта от других обработчиков, число попыток
+# и начальная задержка повтора (сек., удваивается с каждой попыткой)
+JOBS_CONCURRENCY = 4
+JOBS_POLL_INTERVAL = 1
+JOBS_VISIBILITY_TIMEOUT = 300
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+# Выполнять задачи сразу при постановке, без очереди
+JOBS_EAGER = False
+
+# В тестах задачи выполняются сразу, а посещения пишутся без фонового
+# потока, который пережил бы тестовую базу (см. core.test_runner)
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Лента подписок: сколько последних постов хранится в ленте
+# пользователя и с какого числа подписчиков посты автора
+# не рассылаются по лентам, а подмешиваются при чтении; раз
+# в сколько секунд ленты обрезаются до TIMELINE_SIZE
+TIMELINE_SIZE = 500
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_TRIM_INTERVAL = 5 * 60
+
+# Поиск: постов в выпадающем списке за раз, предел точного подсчёта
+# найденного (дальше — «100+») и срок (дни), за который вес
+# результата ослабевает вдвое
+SEARCH_PAGE_SIZE = 10
+SEARCH_COUNT_CAP = 100
+SEARCH_RECENCY_DAYS = 30
+# Сколько групп, авторов и комментариев показывать в своих разделах
+SEARCH_SECTION_SIZE = 3
+# Подсказки при наборе: минимальная длина запроса, число подсказок,
+# время жизни ответа (сек.), размер и время жизни префиксного индекса
+SEARCH_TYPEAHEAD_MIN_LENGTH = 3
+SEARCH_TYPEAHEAD_LIMIT = 8
+SEARCH_TYPEAHEAD_TTL = 60
+SEARCH_TYPEAHEAD_TERMS = 5000
+SEARCH_TYPEAHEAD_INDEX_TTL = 300
 
 # Подключаем вход через соцсети (VK)
 # SOCIAL_AUTH_VK_OAUTH2_KEY = os.getenv('SOCIAL_AUTH_VK_OAUTH2_KEY')
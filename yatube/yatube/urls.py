@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import cache_health
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls),
@@ -11,6 +13,7 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('search/', include('search.urls', namespace='search')),
     path('auth/verify/', include('social_django.urls', namespace='social')),
+    path('health/cache/', cache_health, name='cache_health'),
 ]
 
 handler404 = 'core.views.page_not_found'